@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import secrets
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.benchmarks.common import bench_app, seed_users
+from backend.config import settings
+from backend.main import app
+
+
+async def export_via_asgi(export_format: str, admin_key: str) -> int:
+    # Drive the ASGI app directly: httpx's ASGITransport buffers the whole
+    # body, which would hide whether the endpoint itself streams.
+    lines = 0
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/users/export",
+        "raw_path": b"/users/export",
+        "query_string": f"format={export_format}".encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"x-admin-key", admin_key.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal lines
+        if message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+
+    await app(scope, receive, send)
+    finished.set()
+    return lines
+
+
+async def run(rows: int, export_format: str):
+    settings.ADMIN_API_KEY = secrets.token_urlsafe()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        async with bench_app(engine) as session_factory:
+            await seed_users(session_factory, rows, password="x" * 64)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            exported = await export_via_asgi(export_format, settings.ADMIN_API_KEY)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    if export_format == "csv":
+        exported -= 1
+    print(
+        f"exported {exported} rows as {export_format} in {elapsed:.2f}s "
+        f"({exported / elapsed:,.0f} rows/sec, peak traced memory "
+        f"{peak / 1024 / 1024:.1f} MiB)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.bench_export")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.format))
+
+
+if __name__ == "__main__":
+    main()
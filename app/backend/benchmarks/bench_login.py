@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.benchmarks.common import (
+    PASSWORD,
+    bench_app,
+    email_for,
+    seed_users,
+    summarize,
+    use_cheap_hashing,
+)
+from backend.database.database import build_engine, warm_up_pool
+from backend.main import app
+
+
+async def login_storm(engine, users: int, concurrency: int, duration: float):
+    async with bench_app(engine) as session_factory:
+        await seed_users(session_factory, users)
+        latencies: list[float] = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker(client: AsyncClient, offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/auth/login",
+                    data={"username": email_for(i % users), "password": PASSWORD},
+                )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+                i += concurrency
+
+        transport = ASGITransport(app=app, raise_app_exceptions=False)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client, n) for n in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+async def run(users: int, concurrency: int, duration: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'plain.db'}")
+        tuned = build_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'tuned.db'}")
+        await warm_up_pool(tuned, tuned.pool.size())
+
+        results = {
+            "default engine": await login_storm(baseline, users, concurrency, duration),
+            "tuned engine": await login_storm(tuned, users, concurrency, duration),
+        }
+
+    for name, result in results.items():
+        print(
+            f"{name:>15}: {result['rps']:8.1f} logins/sec  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+            f"({result['requests']} requests, {result['errors']} errors)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.bench_login")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--cheap-hash",
+        action="store_true",
+        help="use minimal Argon2 parameters so database cost is not hidden by hashing",
+    )
+    args = parser.parse_args()
+    if args.cheap_hash:
+        use_cheap_hashing()
+    asyncio.run(run(args.users, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
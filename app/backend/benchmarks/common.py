@@ -0,0 +1,91 @@
+from contextlib import asynccontextmanager
+import statistics
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from backend.config import settings
+from backend.database import models
+from backend.database.database import Base, get_db
+from backend.helpers import credentials
+from backend.main import app
+
+PASSWORD = "benchmark"
+
+
+def email_for(i: int) -> str:
+    return f"user{i}@bench.example.com"
+
+
+def use_cheap_hashing():
+    credentials.password_hash = credentials.build_password_hash(1, 1024, 1)
+
+
+async def seed_users(
+    session_factory, users: int, password: str | None = None, chunk: int = 5000
+):
+    # Argon2 salts make every hash unique; one shared hash keeps seeding fast.
+    hashed = password or credentials.hash_password(PASSWORD)
+    async with session_factory() as session:
+        for start in range(0, users, chunk):
+            await session.execute(
+                insert(models.User),
+                [
+                    {
+                        "username": f"user{i}"[:16],
+                        "email": email_for(i),
+                        "password": hashed,
+                    }
+                    for i in range(start, min(start + chunk, users))
+                ],
+            )
+        await session.commit()
+
+
+@asynccontextmanager
+async def bench_app(engine: AsyncEngine):
+    session_factory = async_sessionmaker(
+        expire_on_commit=False, bind=engine, class_=AsyncSession
+    )
+    async with engine.begin() as con:
+        await con.run_sync(Base.metadata.create_all)
+
+    async def get_bench_db():
+        async with session_factory() as session:
+            yield session
+
+    # Every simulated client shares one address and a handful of emails.
+    rate_limit_enabled = settings.LOGIN_RATE_LIMIT_ENABLED
+    settings.LOGIN_RATE_LIMIT_ENABLED = False
+    app.dependency_overrides[get_db] = get_bench_db
+    try:
+        yield session_factory
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        settings.LOGIN_RATE_LIMIT_ENABLED = rate_limit_enabled
+        await engine.dispose()
+
+
+class QueryCounter:
+    def __init__(self, engine: AsyncEngine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    if len(latencies) >= 2:
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    else:
+        quantiles = latencies * 99 or [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
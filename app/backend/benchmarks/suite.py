@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+import uuid
+from httpx import ASGITransport, AsyncClient
+from backend.benchmarks.common import (
+    PASSWORD,
+    QueryCounter,
+    bench_app,
+    email_for,
+    seed_users,
+    summarize,
+    use_cheap_hashing,
+)
+from backend.database.database import build_engine, warm_up_pool
+from backend.main import app
+
+SCENARIOS = ("login", "refresh", "read", "mixed")
+MIXED_WEIGHTS = {"login": 1, "refresh": 2, "read": 7}
+REMOTE_SEED_CHUNK = 1000
+
+
+class Client:
+    # One simulated device: it keeps its own tokens so refresh rotation and
+    # authenticated reads behave like a real session.
+
+    def __init__(self, http: AsyncClient, email: str, device_id: str):
+        self.http = http
+        self.email = email
+        self.device_id = device_id
+        self.user_id: int | None = None
+        self.access_token: str | None = None
+        self.refresh_token: str | None = None
+
+    async def login(self) -> int:
+        response = await self.http.post(
+            "/auth/login",
+            data={"username": self.email, "password": PASSWORD},
+            headers={"X-Device-Id": self.device_id},
+        )
+        if response.status_code == 200:
+            self.access_token = response.json()["access_token"]
+            self.refresh_token = response.json()["refresh_token"]
+        return response.status_code
+
+    async def refresh(self) -> int:
+        response = await self.http.post(
+            "/auth/refresh", json={"refresh_token": self.refresh_token}
+        )
+        if response.status_code == 200:
+            self.access_token = response.json()["access_token"]
+            self.refresh_token = response.json()["refresh_token"]
+        return response.status_code
+
+    async def read(self) -> int:
+        response = await self.http.get(
+            f"/users/{self.user_id}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        return response.status_code
+
+
+async def run_scenario(
+    http: AsyncClient,
+    scenario: str,
+    emails: list[str],
+    user_ids: dict[str, int],
+    concurrency: int,
+    duration: float,
+    queries: QueryCounter | None,
+) -> dict:
+    clients = [
+        Client(http, emails[n % len(emails)], f"bench-{n}") for n in range(concurrency)
+    ]
+    for client in clients:
+        client.user_id = user_ids.get(client.email)
+        await client.login()
+    if queries is not None:
+        queries.reset()
+
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: Client, seed: int):
+        nonlocal errors
+        rng = random.Random(seed)
+        operations = list(MIXED_WEIGHTS)
+        weights = list(MIXED_WEIGHTS.values())
+        while time.perf_counter() < deadline:
+            operation = scenario
+            if scenario == "mixed":
+                operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            status_code = await getattr(client, operation)()
+            latencies.append(time.perf_counter() - started)
+            if status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client, n) for n, client in enumerate(clients)))
+    result = summarize(latencies, errors, time.perf_counter() - started)
+    if queries is not None:
+        result["queries_per_request"] = queries.count / max(len(latencies), 1)
+    return result
+
+
+@asynccontextmanager
+async def in_process_target(users: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        await warm_up_pool(engine, engine.pool.size())
+        queries = QueryCounter(engine)
+        async with bench_app(engine) as session_factory:
+            await seed_users(session_factory, users)
+            emails = [email_for(i) for i in range(users)]
+            user_ids = {email: i + 1 for i, email in enumerate(emails)}
+            transport = ASGITransport(app=app, raise_app_exceptions=False)
+            async with AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as http:
+                yield http, emails, user_ids, queries
+
+
+@asynccontextmanager
+async def remote_target(url: str, users: int, admin_key: str | None):
+    # Accounts are created through the bulk API, so the server hashes every
+    # password; keep --users modest and disable login throttling on the server.
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"bench{run_id}-{i}@bench.example.com" for i in range(users)]
+    user_ids: dict[str, int] = {}
+    async with AsyncClient(base_url=url, timeout=120) as http:
+        for start in range(0, users, REMOTE_SEED_CHUNK):
+            chunk = emails[start : start + REMOTE_SEED_CHUNK]
+            response = await http.post(
+                "/users/bulk",
+                headers={"X-Admin-Key": admin_key or ""},
+                json={
+                    "users": [
+                        {
+                            "username": f"b{run_id}{i}"[:16],
+                            "email": email,
+                            "password": PASSWORD,
+                        }
+                        for i, email in enumerate(chunk, start)
+                    ]
+                },
+            )
+            response.raise_for_status()
+            user_ids.update(
+                {
+                    row["email"]: row["id"]
+                    for row in response.json()["results"]
+                    if row["status"] == "created"
+                }
+            )
+        yield http, emails, user_ids, None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for scenario, result in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{scenario}: p95 {result['p95_ms']:.1f} ms vs {base['p95_ms']:.1f} ms"
+            )
+        if result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(
+                f"{scenario}: {result['rps']:.1f} req/s vs {base['rps']:.1f} req/s"
+            )
+        queries = result.get("queries_per_request")
+        base_queries = base.get("queries_per_request")
+        if queries is not None and base_queries is not None:
+            if queries > base_queries + 0.01:
+                regressions.append(
+                    f"{scenario}: {queries:.2f} queries/request "
+                    f"vs {base_queries:.2f}"
+                )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.url:
+        target = remote_target(args.url, args.users, args.admin_key)
+    else:
+        target = in_process_target(args.users)
+
+    results = {}
+    async with target as (http, emails, user_ids, queries):
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(
+                http,
+                scenario,
+                emails,
+                user_ids,
+                args.concurrency,
+                args.duration,
+                queries,
+            )
+    return results
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.suite")
+    parser.add_argument(
+        "--url", help="benchmark a running server instead of the in-process app"
+    )
+    parser.add_argument(
+        "--admin-key", help="the server's ADMIN_API_KEY, used to seed users (--url)"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--cheap-hash",
+        action="store_true",
+        help="use minimal Argon2 parameters (in-process only)",
+    )
+    parser.add_argument("--baseline", type=Path, help="fail on regressions against")
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative p95/throughput regression (default 0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+    if args.cheap_hash:
+        use_cheap_hashing()
+
+    results = asyncio.run(run(args))
+    for scenario, result in results.items():
+        queries = result.get("queries_per_request")
+        print(
+            f"{scenario:>8}: {result['rps']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+            f"p99 {result['p99_ms']:7.1f} ms  "
+            + (f"{queries:5.2f} queries/req  " if queries is not None else "")
+            + f"({result['requests']} requests, {result['errors']} errors)"
+        )
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(
+            results, json.loads(args.baseline.read_text()), args.threshold
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
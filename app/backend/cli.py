@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+import secrets
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from backend.config import settings
+from backend.database.database import SessionLocal, engine
+from backend.helpers.credentials import calibrate_argon2
+from backend.helpers.email_filter import BloomFilter
+from backend.helpers.revocation import revoke_all_sessions
+from backend.helpers.token_sweeper import purge_expired_refresh_tokens, sweep_stats
+
+
+async def purge_refresh_tokens(args: argparse.Namespace):
+    try:
+        purged = await purge_expired_refresh_tokens(SessionLocal, args.batch_size)
+    finally:
+        await engine.dispose()
+    print(
+        f"Purged {purged} expired refresh tokens in {sweep_stats.batches} batches "
+        f"(max batch {sweep_stats.max_batch_duration_s * 1000:.1f} ms)"
+    )
+
+
+async def revoke_sessions(args: argparse.Namespace):
+    try:
+        async with SessionLocal() as session:
+            revoked_before = await revoke_all_sessions(session)
+    finally:
+        await engine.dispose()
+    print(f"Revoked every token issued before {revoked_before.isoformat()}")
+
+
+async def generate_signing_key(args: argparse.Namespace):
+    if args.algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+
+    kid = args.kid or (
+        f"{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{secrets.token_hex(4)}"
+    )
+    keys_dir = Path(args.keys_dir)
+    keys_dir.mkdir(parents=True, exist_ok=True)
+    path = keys_dir / f"{kid}.pem"
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    path.chmod(0o600)
+    print(f"Wrote {args.algorithm} signing key {kid} to {path}")
+
+
+async def email_filter_report(args: argparse.Namespace):
+    bloom = BloomFilter(args.users, args.error_rate)
+    started = time.perf_counter()
+    for i in range(args.users):
+        bloom.add(f"user{i}@example.com")
+    build_s = time.perf_counter() - started
+
+    false_positives = sum(
+        f"absent{i}@example.com" in bloom for i in range(args.probes)
+    )
+    print(
+        f"{args.users} emails: {bloom.memory_bytes / 2**20:.1f} MiB, "
+        f"{bloom.hashes} hashes, built in {build_s:.1f} s\n"
+        f"false positive rate: expected {bloom.false_positive_rate():.4%}, "
+        f"measured {false_positives / args.probes:.4%} over {args.probes} probes"
+    )
+
+
+async def calibrate_hashing(args: argparse.Namespace):
+    result = calibrate_argon2(
+        args.target_ms / 1000, args.max_memory_mib * 1024, args.parallelism
+    )
+    print(
+        f"time_cost={result['time_cost']} memory={result['memory_cost_kib']} KiB "
+        f"parallelism={result['parallelism']}: "
+        f"{result['duration_s'] * 1000:.0f} ms per hash on this host\n"
+        "Add to .env:\n"
+        f"ARGON2_TIME_COST={result['time_cost']}\n"
+        f"ARGON2_MEMORY_COST_KIB={result['memory_cost_kib']}\n"
+        f"ARGON2_PARALLELISM={result['parallelism']}"
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    purge = commands.add_parser(
+        "purge-refresh-tokens", help="Delete expired refresh tokens once"
+    )
+    purge.add_argument(
+        "--batch-size", type=int, default=settings.REFRESH_TOKEN_SWEEP_BATCH_SIZE
+    )
+    purge.set_defaults(handler=purge_refresh_tokens)
+
+    revoke = commands.add_parser(
+        "revoke-all-sessions", help="Invalidate every issued access/refresh token"
+    )
+    revoke.set_defaults(handler=revoke_sessions)
+
+    keygen = commands.add_parser(
+        "generate-signing-key", help="Create a new JWT signing key for rotation"
+    )
+    keygen.add_argument("--algorithm", choices=["EdDSA", "ES256"], default="EdDSA")
+    keygen.add_argument(
+        "--keys-dir",
+        default=settings.JWT_KEYS_DIR,
+        required=settings.JWT_KEYS_DIR is None,
+    )
+    keygen.add_argument("--kid")
+    keygen.set_defaults(handler=generate_signing_key)
+
+    report = commands.add_parser(
+        "email-filter-report",
+        help="Size and measure the registered-email filter for a user count",
+    )
+    report.add_argument("--users", type=int, default=3_000_000)
+    report.add_argument(
+        "--error-rate", type=float, default=settings.EMAIL_FILTER_ERROR_RATE
+    )
+    report.add_argument("--probes", type=int, default=100_000)
+    report.set_defaults(handler=email_filter_report)
+
+    calibrate = commands.add_parser(
+        "calibrate-argon2",
+        help="Pick Argon2 parameters that hash in a target time on this host",
+    )
+    calibrate.add_argument("--target-ms", type=float, default=250.0)
+    calibrate.add_argument("--max-memory-mib", type=int, default=64)
+    calibrate.add_argument(
+        "--parallelism", type=int, default=settings.ARGON2_PARALLELISM
+    )
+    calibrate.set_defaults(handler=calibrate_hashing)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
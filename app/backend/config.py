@@ -1,11 +1,78 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     SECRET_KEY: str
-    ALGORITHM: str = "HS256"
+    ALGORITHM: Literal["HS256", "HS384", "HS512", "EdDSA", "ES256"] = "HS256"
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    JWKS_MAX_AGE_S: int = 3600
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_SIZE: int = 50_000
 
     DB_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 30.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = False
+
+    DB_READ_URL: str | None = None
+    READ_YOUR_WRITES_WINDOW_S: float = 5.0
+
+    SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE", "MEMORY"] = "WAL"
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -20_000
+
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 65_536
+    ARGON2_PARALLELISM: int = 4
+
+    HASH_POOL_KIND: Literal["thread", "process"] = "thread"
+    HASH_POOL_WORKERS: int = 4
+    HASH_QUEUE_SIZE: int = 64
+
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_SIZE: int = 10_000
+    AUTH_CACHE_TTL_S: float = 60.0
+
+    INVALIDATION_BACKEND: Literal["local", "unix"] = "local"
+    INVALIDATION_SOCKET_DIR: str = "/tmp/simpleloginapi-invalidation"
+
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL_S: float = 5.0
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SLOW_REQUESTS: int = 50
+    PROFILING_WINDOW_S: float = 3600.0
+    PROFILING_STACK_INTERVAL_S: float = 0.005
+
+    ADMIN_API_KEY: str | None = None
+    INTROSPECTION_API_KEY: str | None = None
+    REVOCATION_EPOCH_TTL_S: float = 5.0
+
+    MAX_SESSIONS_PER_USER: int = 10
+    SESSION_CACHE_SIZE: int = 100_000
+
+    EMAIL_FILTER_ENABLED: bool = True
+    EMAIL_FILTER_CAPACITY: int = 1_000_000
+    EMAIL_FILTER_ERROR_RATE: float = 0.001
+    EMAIL_FILTER_SYNC_INTERVAL_S: float = 30.0
+
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 5
+    LOGIN_RATE_LIMIT_PER_IP: int = 20
+    LOGIN_RATE_LIMIT_WINDOW_S: float = 60.0
+    LOGIN_RATE_LIMIT_BACKEND: Literal["memory", "shared"] = "memory"
+    LOGIN_RATE_LIMIT_SHM_NAME: str = "simpleloginapi-login-limits"
+    LOGIN_RATE_LIMIT_SLOTS: int = 65_536
+
+    REFRESH_TOKEN_SWEEP_INTERVAL_S: float = 300.0
+    REFRESH_TOKEN_SWEEP_BATCH_SIZE: int = 1000
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,16 +1,78 @@
-from typing import Annotated
+import asyncio
+import logging
+from typing import Annotated, Iterable
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import Connection, event, inspect, make_url, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+    AsyncSession,
+)
 from sqlalchemy.orm import DeclarativeBase
 from backend.config import settings
+from backend.helpers.cache import TTLCache
+from backend.helpers.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# create_all never alters an existing table. These only hold session state, so
+# an outdated copy is dropped and recreated instead of migrated.
+REBUILT_ON_SCHEMA_CHANGE = ("refresh_tokens",)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+
+def build_engine(url: str) -> AsyncEngine:
+    database_url = make_url(url)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+    }
+    # In-memory SQLite runs on a single static connection without a queue.
+    if database_url.database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_S,
+        )
+
+    new_engine = create_async_engine(database_url, **options)
+    if database_url.get_backend_name() == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", set_sqlite_pragmas)
+    instrument_engine(new_engine)
+    return new_engine
+
+
+async def warm_up_pool(target: AsyncEngine, connections: int):
+    async def open_connection():
+        async with target.connect() as con:
+            await con.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(open_connection() for _ in range(connections)))
 
 
 SQLALCHEMY_DATABASE_URL = settings.DB_URL
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = async_sessionmaker(
     expire_on_commit=False, bind=engine, class_=AsyncSession
 )
 
+read_engine = build_engine(settings.DB_READ_URL) if settings.DB_READ_URL else None
+ReadSessionLocal = (
+    async_sessionmaker(expire_on_commit=False, bind=read_engine, class_=AsyncSession)
+    if read_engine is not None
+    else None
+)
+recent_writers = TTLCache(maxsize=100_000, ttl=settings.READ_YOUR_WRITES_WINDOW_S)
+
 
 class Base(DeclarativeBase):
     pass
@@ -21,9 +83,71 @@ async def get_db():
         yield session
 
 
+def insert_ignoring_conflicts(
+    model: type[Base], db: AsyncSession, *index_elements: str
+):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported on {dialect}")
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def rebuild_outdated_tables(connection: Connection) -> list[str]:
+    inspector = inspect(connection)
+    rebuilt = []
+    for name in REBUILT_ON_SCHEMA_CHANGE:
+        table = Base.metadata.tables.get(name)
+        if table is None or not inspector.has_table(name):
+            continue
+        columns = {column["name"] for column in inspector.get_columns(name)}
+        indexes = {index["name"] for index in inspector.get_indexes(name)}
+        expected_indexes = {index.name for index in table.indexes}
+        if set(table.columns.keys()) <= columns and expected_indexes <= indexes:
+            continue
+        table.drop(connection)
+        rebuilt.append(name)
+    return rebuilt
+
+
 async def create_db_tables():
     async with engine.begin() as con:
+        rebuilt = await con.run_sync(rebuild_outdated_tables)
+        if rebuilt:
+            logger.warning("Recreated outdated tables: %s", ", ".join(rebuilt))
         await con.run_sync(Base.metadata.create_all)
 
 
 DB_SESSION = Annotated[AsyncSession, Depends(get_db)]
+
+
+async def get_read_db(db: DB_SESSION):
+    if ReadSessionLocal is None:
+        yield db
+        return
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def mark_user_write(user_id: int):
+    recent_writers.set(user_id, True)
+
+
+def session_for_user(
+    user_id: int, db: AsyncSession, read_db: AsyncSession | None
+) -> AsyncSession:
+    return session_for_users((user_id,), db, read_db)
+
+
+def session_for_users(
+    user_ids: Iterable[int], db: AsyncSession, read_db: AsyncSession | None
+) -> AsyncSession:
+    if read_db is None or any(recent_writers.get(id) for id in user_ids):
+        return db
+    return read_db
+
+
+DB_READ_SESSION = Annotated[AsyncSession, Depends(get_read_db)]
@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel, ConfigDict, Field, EmailStr, SecretStr
 
 
@@ -7,6 +9,21 @@ class UserRegister(BaseModel):
     password: SecretStr = Field(min_length=3, max_length=16)
 
 
+class UserBulkRegister(BaseModel):
+    users: list[UserRegister] = Field(min_length=1, max_length=1000)
+
+
+class UserImportResult(BaseModel):
+    email: EmailStr
+    status: Literal["created", "exists", "duplicate"]
+    id: int | None = None
+
+
+class UserBulkResult(BaseModel):
+    created: int
+    results: list[UserImportResult]
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: SecretStr
@@ -25,11 +42,39 @@ class UserDisplay(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserPage(BaseModel):
+    items: list[UserDisplay]
+    next_cursor: str | None = None
+
+
 class Tokens(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str
 
 
+class SessionDisplay(BaseModel):
+    id: str
+    device_id: str | None = None
+    expires_at: datetime
+    current: bool = False
+
+
 class RefreshRequest(BaseModel):
     refresh_token: str
+
+
+class IntrospectRequest(BaseModel):
+    tokens: list[str] = Field(min_length=1, max_length=500)
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: str | None = None
+    exp: int | None = None
+    iat: float | None = None
+    token_type: Literal["access_token"] | None = None
+
+
+class IntrospectResponse(BaseModel):
+    results: list[TokenIntrospection]
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from backend.config import settings
+from backend.database.database import mark_user_write
+from backend.helpers.cache import PendingLoad, TTLCache
+from backend.helpers.invalidation import USER_TOPIC, invalidation_bus
+from backend.helpers.metrics import watch_cache
+
+
+@dataclass(frozen=True, slots=True)
+class AuthUser:
+    id: int
+    username: str
+    email: str
+    token_version: str
+
+
+auth_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_S)
+watch_cache("auth", auth_cache)
+
+
+def get_cached_user(user_id: int) -> AuthUser | None:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    return auth_cache.get(user_id)
+
+
+def cache_user(user: AuthUser, load: PendingLoad | None = None):
+    if settings.AUTH_CACHE_ENABLED:
+        if load is not None:
+            load.set(user)
+        else:
+            auth_cache.set(user.id, user)
+
+
+def invalidate_user(user_id: int):
+    invalidation_bus.publish(USER_TOPIC, str(user_id))
+
+
+def _on_user_invalidated(payload: str):
+    user_id = int(payload)
+    auth_cache.pop(user_id)
+    mark_user_write(user_id)
+
+
+invalidation_bus.subscribe(USER_TOPIC, _on_user_invalidated)
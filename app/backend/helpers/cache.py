@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import time
+from typing import Any, Hashable
+
+
+class PendingLoad:
+    # A pop() while the value is being loaded marks the load stale, so a
+    # request that read the old row cannot put it back into the cache.
+    __slots__ = ("cache", "key", "stale")
+
+    def __init__(self, cache: "TTLCache", key: Hashable):
+        self.cache = cache
+        self.key = key
+        self.stale = False
+
+    def set(self, value: Any, ttl: float | None = None):
+        if not self.stale:
+            self.cache.set(self.key, value, ttl)
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._loading: dict[Hashable, list[PendingLoad]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    @contextmanager
+    def loading(self, key: Hashable):
+        load = PendingLoad(self, key)
+        self._loading.setdefault(key, []).append(load)
+        try:
+            yield load
+        finally:
+            loads = self._loading[key]
+            loads.remove(load)
+            if not loads:
+                del self._loading[key]
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+        for load in self._loading.get(key, ()):
+            load.stale = True
+
+    def clear(self):
+        self._data.clear()
+        for loads in self._loading.values():
+            for load in loads:
+                load.stale = True
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
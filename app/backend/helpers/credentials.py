@@ -1,7 +1,37 @@
-from fastapi import HTTPException, status
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import secrets
+import statistics
+import time
+from typing import Annotated
+from fastapi import Header, HTTPException, status
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+import backend.database.models as models
+from backend.helpers.metrics import password_hash_duration, password_hash_wait
+from backend.helpers.profiling import record_phase
+from backend.config import settings
 
-password_hash = PasswordHash.recommended()
+
+def build_password_hash(
+    time_cost: int, memory_cost: int, parallelism: int
+) -> PasswordHash:
+    return PasswordHash(
+        (
+            Argon2Hasher(
+                time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+            ),
+        )
+    )
+
+
+password_hash = build_password_hash(
+    settings.ARGON2_TIME_COST,
+    settings.ARGON2_MEMORY_COST_KIB,
+    settings.ARGON2_PARALLELISM,
+)
 
 
 def hash_password(password: str) -> str:
@@ -12,8 +42,188 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return password_hash.verify(plain_password, hashed_password)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    # Same check verify_and_update() makes, without hashing inline: the new
+    # hash is computed after the response by rehash_password().
+    hasher = password_hash.current_hasher
+    return not hasher.identify(hashed_password) or hasher.check_needs_rehash(
+        hashed_password
+    )
+
+
+def calibrate_argon2(
+    target_s: float, max_memory_kib: int, parallelism: int, samples: int = 3
+) -> dict:
+    # Spend the memory budget first, then add passes until the target latency
+    # is reached; if one pass is already too slow, give back memory instead.
+    def measure(time_cost: int, memory_cost: int) -> float:
+        hasher = build_password_hash(time_cost, memory_cost, parallelism)
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hasher.hash("calibration-password")
+            durations.append(time.perf_counter() - started)
+        return statistics.median(durations)
+
+    memory_cost = max_memory_kib
+    time_cost = 1
+    duration = measure(time_cost, memory_cost)
+    while duration > target_s and memory_cost // 2 >= 8 * parallelism:
+        memory_cost //= 2
+        duration = measure(time_cost, memory_cost)
+    while duration < target_s:
+        next_duration = measure(time_cost + 1, memory_cost)
+        if next_duration > target_s:
+            break
+        time_cost += 1
+        duration = next_duration
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost_kib": memory_cost,
+        "parallelism": parallelism,
+        "duration_s": duration,
+    }
+
+
+def timed_call(func, *args):
+    # Runs inside the executor, possibly in another process, so the duration
+    # travels back with the result.
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class HashingPool:
+    def __init__(self, workers: int, max_pending: int, use_processes: bool = False):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="argon2"
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            result, duration = await loop.run_in_executor(
+                self.executor, timed_call, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+        operation = (func.__name__,)
+        wait = max(time.perf_counter() - started - duration, 0.0)
+        password_hash_duration.observe(operation, duration)
+        password_hash_wait.observe(operation, wait)
+        record_phase("hashing", duration)
+        record_phase("hash_wait", wait)
+        return result
+
+    async def map(self, func, items) -> list:
+        # Bulk work never holds more than half the workers, so interactive
+        # logins always find one free.
+        semaphore = asyncio.Semaphore(max(1, self.workers // 2))
+
+        async def run_one(item):
+            async with semaphore:
+                return await self.run(func, item)
+
+        tasks = [asyncio.ensure_future(run_one(item)) for item in items]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    workers=settings.HASH_POOL_WORKERS,
+    max_pending=settings.HASH_POOL_WORKERS + settings.HASH_QUEUE_SIZE,
+    use_processes=settings.HASH_POOL_KIND == "process",
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
+
+
+async def hash_passwords_async(passwords: list[str]) -> list[str]:
+    return await hashing_pool.map(hash_password, passwords)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def rehash_password(
+    bind: AsyncEngine, user_id: int, plain_password: str, old_hash: str
+):
+    try:
+        new_hash = await hash_password_async(plain_password)
+    except HTTPException:
+        # The pool is saturated; the next login will try again.
+        return
+
+    async with AsyncSession(bind) as session:
+        await session.execute(
+            update(models.User)
+            .where(models.User.id == user_id, models.User.password == old_hash)
+            .values(password=new_hash)
+        )
+        await session.commit()
+
+
 def compare_ids(current_user_id, selected_user_id):
     if current_user_id != selected_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
         )
+
+
+def check_api_key(provided: str | None, expected: str | None):
+    if (
+        expected is None
+        or provided is None
+        or not secrets.compare_digest(provided, expected)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
+        )
+
+
+def verify_admin_key(x_admin_key: Annotated[str | None, Header()] = None):
+    check_api_key(x_admin_key, settings.ADMIN_API_KEY)
+
+
+def verify_introspection_key(
+    x_introspection_key: Annotated[str | None, Header()] = None,
+):
+    check_api_key(x_introspection_key, settings.INTROSPECTION_API_KEY)
@@ -0,0 +1,215 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+import hashlib
+import logging
+import math
+import time
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+import backend.database.models as models
+from backend.helpers.invalidation import invalidation_bus
+from backend.config import settings
+
+EMAIL_TOPIC = "email"
+RESCAN_MARGIN_S = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * step) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def false_positive_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class EmailFilter:
+    # Bloom filters cannot forget, so deleted emails stay "maybe registered"
+    # until the next rebuild; that only costs a database lookup. New emails
+    # arrive over the bus, which may drop messages or not reach other hosts,
+    # so a miss only becomes "not registered" after a sync that started after
+    # the lookup. Concurrent misses share one sync.
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self.removed = 0
+        self.skipped_lookups = 0
+        self.syncs = 0
+        self.synced_id = 0
+        self._marks: deque[tuple[float, int]] = deque()
+        self._session_factory: async_sessionmaker | None = None
+        self._running: asyncio.Future | None = None
+        self._queued: asyncio.Future | None = None
+
+    def might_contain(self, email: str) -> bool:
+        # Unconfirmed: may miss an email registered moments ago on another
+        # worker. Only for callers that recheck, like the conflict-aware insert.
+        return not self.ready or email in self.bloom
+
+    async def is_absent(self, email: str) -> bool:
+        if self.might_contain(email):
+            return False
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Email filter sync failed")
+            return False
+        if email in self.bloom:
+            return False
+        self.skipped_lookups += 1
+        return True
+
+    async def load(self, session_factory: async_sessionmaker, batch_size: int = 10_000):
+        self.ready = False
+        self._session_factory = session_factory
+        async with session_factory() as session:
+            users = await session.scalar(select(func.count(models.User.id)))
+            # Emails registered while the load runs are added to the new filter
+            # through the bus, so it is swapped in before streaming starts.
+            self.bloom = BloomFilter(
+                max(settings.EMAIL_FILTER_CAPACITY, users * 5 // 4), self.error_rate
+            )
+            self.removed = 0
+            synced_id = 0
+            result = await session.stream(
+                select(models.User.id, models.User.email).execution_options(
+                    yield_per=batch_size
+                )
+            )
+            async for id, email in result:
+                self.bloom.add(email)
+                synced_id = max(synced_id, id)
+        self.synced_id = synced_id
+        self._marks = deque([(time.monotonic(), synced_id)])
+        self.ready = True
+
+    def _rescan_from(self, now: float) -> int:
+        # Ids are allocated before commit, so a row below the high-water mark
+        # can still appear while its transaction is open. Rescan from the
+        # newest mark at least RESCAN_MARGIN_S old.
+        while len(self._marks) > 1 and self._marks[1][0] <= now - RESCAN_MARGIN_S:
+            self._marks.popleft()
+        return self._marks[0][1]
+
+    async def _sync(self):
+        if not self.ready:
+            return
+        started = time.monotonic()
+        async with self._session_factory() as session:
+            rows = await session.execute(
+                select(models.User.id, models.User.email).where(
+                    models.User.id > self._rescan_from(started)
+                )
+            )
+            synced_id = self.synced_id
+            for id, email in rows:
+                if email not in self.bloom:
+                    self.bloom.add(email)
+                synced_id = max(synced_id, id)
+        self.synced_id = synced_id
+        self._marks.append((started, synced_id))
+        self.syncs += 1
+
+    async def refresh(self):
+        # A sync already running may have started before the caller's miss,
+        # so callers share the next one queued behind it.
+        if self._queued is None:
+            self._queued = asyncio.ensure_future(self._sync_after(self._running))
+        await asyncio.shield(self._queued)
+
+    async def _sync_after(self, previous: asyncio.Future | None):
+        if previous is not None:
+            with suppress(Exception):
+                await previous
+        self._running, self._queued = self._queued, None
+        try:
+            await self._sync()
+        finally:
+            if self._running is asyncio.current_task():
+                self._running = None
+
+    def reset(self):
+        self.bloom = BloomFilter(self.bloom.capacity, self.error_rate)
+        self.ready = False
+        self.removed = 0
+        self.skipped_lookups = 0
+        self.syncs = 0
+        self.synced_id = 0
+        self._marks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "emails": self.bloom.count,
+            "removed": self.removed,
+            "capacity": self.bloom.capacity,
+            "hashes": self.bloom.hashes,
+            "memory_bytes": self.bloom.memory_bytes,
+            "false_positive_rate": self.bloom.false_positive_rate(),
+            "skipped_lookups": self.skipped_lookups,
+            "syncs": self.syncs,
+            "synced_id": self.synced_id,
+        }
+
+
+email_filter = EmailFilter(
+    capacity=settings.EMAIL_FILTER_CAPACITY, error_rate=settings.EMAIL_FILTER_ERROR_RATE
+)
+
+
+def email_registered(email: str):
+    invalidation_bus.publish(EMAIL_TOPIC, f"+{email}")
+
+
+def email_removed(email: str):
+    invalidation_bus.publish(EMAIL_TOPIC, f"-{email}")
+
+
+def _on_email_changed(payload: str):
+    if payload.startswith("+"):
+        email_filter.bloom.add(payload[1:])
+    else:
+        email_filter.removed += 1
+
+
+invalidation_bus.subscribe(EMAIL_TOPIC, _on_email_changed)
+
+
+async def run_email_filter_sync(interval_s: float):
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await email_filter.refresh()
+        except Exception:
+            logger.exception("Email filter sync failed")
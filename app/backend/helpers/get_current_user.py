@@ -1,17 +1,31 @@
+from dataclasses import dataclass
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.database import models
-from backend.database.database import DB_SESSION
-from backend.config import settings
+from backend.database.database import DB_READ_SESSION, DB_SESSION, session_for_user
+from backend.helpers.auth_cache import (
+    AuthUser,
+    auth_cache,
+    cache_user,
+    get_cached_user,
+)
+from backend.helpers.revocation import revocation_epoch
+from backend.helpers.sessions import is_session_revoked
+from backend.helpers.tokens import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+LOADED_USER_KEY = "current_user"
+
 
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)], db: DB_SESSION
-):
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: DB_SESSION,
+    read_db: DB_READ_SESSION,
+) -> AuthUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -19,21 +33,70 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         id = payload.get("sub")
         token_version = payload.get("version")
-        if id is None:
+        # Refresh tokens carry a jti and are only valid at /auth/refresh.
+        if id is None or "jti" in payload:
             raise credentials_exception
-    except jwt.InvalidTokenError:
+        user_id = int(id)
+    except (jwt.InvalidTokenError, ValueError, TypeError):
         raise credentials_exception
 
-    user = await db.get(models.User, int(id))
-    if not user or token_version != str(user.token_version):
+    if await is_session_revoked(payload, db) or await revocation_epoch.is_revoked(
+        payload, db
+    ):
         raise credentials_exception
 
-    return user
+    cached = get_cached_user(user_id)
+    if cached is not None and cached.token_version == token_version:
+        return cached
+
+    session = session_for_user(user_id, db, read_db)
+    with auth_cache.loading(user_id) as load:
+        user = await session.get(models.User, user_id)
+        if not user or token_version != str(user.token_version):
+            raise credentials_exception
+        # The identity map only holds weak references; keep the row alive for
+        # the rest of the request so UserContext.load() can reuse it.
+        session.info[LOADED_USER_KEY] = user
+
+        auth_user = AuthUser(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            token_version=str(user.token_version),
+        )
+        cache_user(auth_user, load)
+    return auth_user
+
+
+CURRENT_USER = Annotated[AuthUser, Depends(get_current_user)]
+
+
+async def get_current_user_id(current_user: CURRENT_USER) -> int:
+    return current_user.id
+
+
+CURRENT_USER_ID = Annotated[int, Depends(get_current_user_id)]
+
+
+@dataclass(slots=True)
+class UserContext:
+    user: AuthUser
+    db: AsyncSession
+
+    async def load(self) -> models.User | None:
+        # get_current_user shares this request's session; reuse the row it
+        # loaded unless it came from the auth cache or a read replica.
+        user = self.db.info.get(LOADED_USER_KEY)
+        if user is not None and user.id == self.user.id and user in self.db:
+            return user
+        return await self.db.get(models.User, self.user.id)
+
+
+async def get_user_context(current_user: CURRENT_USER, db: DB_SESSION) -> UserContext:
+    return UserContext(user=current_user, db=db)
 
 
-CURRENT_USER = Annotated[models.User, Depends(get_current_user)]
+CURRENT_USER_CONTEXT = Annotated[UserContext, Depends(get_user_context)]
@@ -0,0 +1,104 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections import defaultdict
+import os
+from pathlib import Path
+import socket
+from typing import Callable
+import uuid
+from backend.config import settings
+
+USER_TOPIC = "user"
+
+
+class InvalidationBus(ABC):
+    # A Redis pub/sub backend only needs to implement publish() and feed
+    # incoming messages to _dispatch() from start().
+
+    def __init__(self):
+        self._subscribers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+
+    def subscribe(self, topic: str, callback: Callable[[str], None]):
+        self._subscribers[topic].append(callback)
+
+    def _dispatch(self, topic: str, payload: str):
+        for callback in self._subscribers.get(topic, ()):
+            callback(payload)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    def publish(self, topic: str, payload: str):
+        pass
+
+
+class LocalInvalidationBus(InvalidationBus):
+    def publish(self, topic: str, payload: str):
+        self._dispatch(topic, payload)
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    def __init__(self, bus: "UnixSocketInvalidationBus"):
+        self.bus = bus
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            topic, payload = data.decode().split("\n", 1)
+        except ValueError:
+            return
+        self.bus._dispatch(topic, payload)
+
+
+class UnixSocketInvalidationBus(InvalidationBus):
+    def __init__(self, socket_dir: str | Path):
+        super().__init__()
+        self.socket_dir = Path(socket_dir)
+        self.path = self.socket_dir / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self._transport: asyncio.DatagramTransport | None = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    async def start(self):
+        if self._transport is not None:
+            return
+        self.socket_dir.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramReceiver(self),
+            local_addr=str(self.path),
+            family=socket.AF_UNIX,
+        )
+
+    async def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        self.path.unlink(missing_ok=True)
+
+    def publish(self, topic: str, payload: str):
+        self._dispatch(topic, payload)
+
+        message = f"{topic}\n{payload}".encode()
+        for peer in self.socket_dir.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self._sender.sendto(message, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                peer.unlink(missing_ok=True)
+            except BlockingIOError:
+                # The peer is not draining its queue; its cache TTL bounds staleness.
+                pass
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    if settings.INVALIDATION_BACKEND == "unix":
+        return UnixSocketInvalidationBus(settings.INVALIDATION_SOCKET_DIR)
+    return LocalInvalidationBus()
+
+
+invalidation_bus = create_invalidation_bus()
@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from pathlib import Path
+import time
+from typing import Any
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+import jwt
+from backend.config import settings
+
+ASYMMETRIC_ALGORITHMS = {"EdDSA", "ES256"}
+
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str | None
+    private_key: Any
+    public_key: Any
+    created_at: float = 0.0
+
+
+class KeyRing:
+    def __init__(
+        self,
+        algorithm: str,
+        keys: list[SigningKey],
+        active_kid: str | None,
+        publish_delay: float = 0.0,
+    ):
+        self.algorithm = algorithm
+        self.keys = {key.kid: key for key in sorted(keys, key=lambda k: k.created_at)}
+        self.publish_delay = publish_delay
+        self.pinned = self.keys[active_kid] if active_kid is not None else None
+
+    @property
+    def active(self) -> SigningKey:
+        # Verifiers may cache the JWKS for publish_delay seconds, so a new key
+        # only starts signing once every cached copy can contain it. Until then
+        # the newest older key keeps signing.
+        if self.pinned is not None:
+            return self.pinned
+        published_before = time.time() - self.publish_delay
+        active = None
+        for key in self.keys.values():
+            if active is None or key.created_at <= published_before:
+                active = key
+        return active
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def verification_key(self, kid: str | None) -> Any:
+        if not self.is_asymmetric:
+            return self.active.public_key
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return key.public_key
+
+    def jwks(self) -> dict:
+        if not self.is_asymmetric:
+            return {"keys": []}
+
+        jwk_algorithm = jwt.get_algorithm_by_name(self.algorithm)
+        keys = []
+        for key in self.keys.values():
+            jwk = jwk_algorithm.to_jwk(key.public_key, as_dict=True)
+            jwk.update({"kid": key.kid, "alg": self.algorithm, "use": "sig"})
+            keys.append(jwk)
+        return {"keys": keys}
+
+
+def load_key_ring(
+    algorithm: str,
+    secret_key: str,
+    keys_dir: str | Path | None = None,
+    active_kid: str | None = None,
+    publish_delay: float = 0.0,
+) -> KeyRing:
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        return KeyRing(algorithm, [SigningKey(None, secret_key, secret_key)], None)
+
+    if keys_dir is None:
+        raise ValueError(f"JWT_KEYS_DIR must be set to sign tokens with {algorithm}")
+
+    # A key counts as published from its file's modification time.
+    keys = []
+    for path in sorted(Path(keys_dir).glob("*.pem")):
+        private_key = load_pem_private_key(path.read_bytes(), password=None)
+        keys.append(
+            SigningKey(
+                path.stem,
+                private_key,
+                private_key.public_key(),
+                created_at=path.stat().st_mtime,
+            )
+        )
+    if not keys:
+        raise ValueError(f"No signing keys found in {keys_dir}")
+
+    return KeyRing(algorithm, keys, active_kid, publish_delay)
+
+
+key_ring = load_key_ring(
+    settings.ALGORITHM,
+    settings.SECRET_KEY,
+    settings.JWT_KEYS_DIR,
+    settings.JWT_ACTIVE_KID,
+    settings.JWKS_MAX_AGE_S,
+)
@@ -0,0 +1,302 @@
+import asyncio
+from bisect import bisect_left
+import json
+import os
+from pathlib import Path
+import time
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from backend.helpers.profiling import record_phase
+from backend.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.series: dict[tuple[str, ...], list[float]] = {}
+
+    def label_text(self, labels: tuple[str, ...]) -> str:
+        return ",".join(
+            f'{name}="{escape_label(value)}"'
+            for name, value in zip(self.label_names, labels)
+        )
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Histogram(Metric):
+    # One flat list per label combination: a count per bucket plus overflow,
+    # then sum and total count. Observing is a dict lookup, a bisect and three
+    # additions.
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+    def observe(self, labels: tuple[str, ...], value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, series: dict[tuple[str, ...], list[float]]) -> list[str]:
+        lines = self.header()
+        for labels, values in sorted(series.items()):
+            label_text = self.label_text(labels)
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple[str, ...], amount: float = 1):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0]
+        series[0] += amount
+
+    def set(self, labels: tuple[str, ...], value: float):
+        # For counters kept elsewhere, copied in by a collect callback.
+        self.series[labels] = [value]
+
+    def render(self, series: dict[tuple[str, ...], list[float]]) -> list[str]:
+        lines = self.header()
+        for labels, values in sorted(series.items()):
+            label_text = self.label_text(labels)
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}{suffix} {values[0]}")
+        return lines
+
+
+def merge_series(
+    target: dict[tuple[str, ...], list[float]],
+    series: dict[tuple[str, ...], list[float]],
+):
+    for labels, values in series.items():
+        current = target.get(labels)
+        if current is None:
+            target[labels] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        histogram = Histogram(*args, **kwargs)
+        self.metrics[histogram.name] = histogram
+        return histogram
+
+    def counter(self, *args, **kwargs) -> Counter:
+        counter = Counter(*args, **kwargs)
+        self.metrics[counter.name] = counter
+        return counter
+
+    def on_collect(self, callback: Callable[[], None]):
+        self._collectors.append(callback)
+
+    def _run_collectors(self):
+        for callback in self._collectors:
+            callback()
+
+    def snapshot(self) -> dict:
+        self._run_collectors()
+        return {
+            name: [[list(labels), values] for labels, values in m.series.items()]
+            for name, m in self.metrics.items()
+        }
+
+    def write_snapshot(self, directory: Path):
+        # Each worker owns one file; rename keeps readers from seeing a
+        # half-written snapshot.
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        tmp.replace(path)
+
+    def collect(self, directory: Path | None = None) -> dict[str, dict]:
+        if directory is None:
+            self._run_collectors()
+            return {name: m.series for name, m in self.metrics.items()}
+
+        self.write_snapshot(directory)
+        merged: dict[str, dict] = {name: {} for name in self.metrics}
+        for path in directory.glob("*.json"):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot.items():
+                if name in merged:
+                    merge_series(
+                        merged[name],
+                        {tuple(labels): values for labels, values in series},
+                    )
+        return merged
+
+    def render(self, directory: Path | None = None) -> str:
+        collected = self.collect(directory)
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.render(collected[name]))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self.metrics.values():
+            metric.series.clear()
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    ("method", "route", "status"),
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Argon2 time spent hashing or verifying, excluding queueing.",
+    ("operation",),
+)
+password_hash_wait = registry.histogram(
+    "password_hash_queue_wait_seconds",
+    "Time an Argon2 call waited for a free hashing worker.",
+    ("operation",),
+    buckets=FAST_BUCKETS + LATENCY_BUCKETS[-5:],
+)
+jwt_duration = registry.histogram(
+    "jwt_duration_seconds",
+    "JWT signing and signature verification time.",
+    ("operation",),
+    buckets=FAST_BUCKETS,
+)
+sql_statement_duration = registry.histogram(
+    "sql_statement_duration_seconds",
+    "SQL statement execution time by statement type.",
+    ("statement",),
+    buckets=FAST_BUCKETS + LATENCY_BUCKETS[-5:],
+)
+refresh_token_sweep_batch_duration = registry.histogram(
+    "refresh_token_sweep_batch_duration_seconds",
+    "Time to delete one batch of expired refresh tokens.",
+    (),
+)
+refresh_tokens_purged = registry.counter(
+    "refresh_tokens_purged_total",
+    "Expired refresh tokens deleted by the background sweeper.",
+    (),
+)
+cache_lookups = registry.counter(
+    "cache_lookups_total",
+    "In-process cache lookups by cache and result.",
+    ("cache", "result"),
+)
+
+SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def _before_cursor_execute(conn, *args):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    verb = statement.lstrip()[:6].upper()
+    sql_statement_duration.observe((verb if verb in SQL_VERBS else "OTHER",), elapsed)
+    record_phase("db", elapsed)
+
+
+def instrument_engine(engine: AsyncEngine):
+    if not (settings.METRICS_ENABLED or settings.PROFILING_ENABLED):
+        return
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def watch_cache(name: str, cache):
+    # Caches count their own hits and misses; copy them in at scrape time
+    # instead of adding a second counter to every lookup.
+    def export():
+        cache_lookups.set((name, "hit"), cache.hits)
+        cache_lookups.set((name, "miss"), cache.misses)
+
+    registry.on_collect(export)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Unmatched paths share one label so scanners cannot blow up the
+            # number of series.
+            route = scope.get("route")
+            http_request_duration.observe(
+                (
+                    scope["method"],
+                    route.path if route is not None else "<unmatched>",
+                    str(status_code),
+                ),
+                time.perf_counter() - started,
+            )
+
+
+async def run_metrics_flusher(directory: Path, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        registry.write_snapshot(directory)
@@ -0,0 +1,248 @@
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import functools
+import heapq
+import inspect
+import itertools
+import random
+import secrets
+import sys
+import threading
+import time
+from fastapi.routing import APIRoute
+from backend.config import settings
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: str | None = None
+        self.status: int | None = None
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.marks: dict[str, float] = {}
+        self.phases: Counter[str] = Counter()
+        self.counts: Counter[str] = Counter()
+        self.stacks: list[tuple[str, int]] = []
+
+    def mark(self, name: str):
+        self.marks.setdefault(name, time.perf_counter())
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] += seconds
+        self.counts[phase] += 1
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def breakdown(self) -> dict[str, float]:
+        # Marks split the request into consecutive spans; the recorded phases
+        # (db, hashing, jwt) overlap them.
+        spans = {}
+        endpoint_started = self.marks.get("endpoint_started")
+        endpoint_finished = self.marks.get("endpoint_finished")
+        response_started = self.marks.get("response_started")
+        if endpoint_started is not None:
+            spans["dependencies"] = endpoint_started - self.started
+        if endpoint_started is not None and endpoint_finished is not None:
+            spans["endpoint"] = endpoint_finished - endpoint_started
+        if endpoint_finished is not None and response_started is not None:
+            spans["serialization"] = response_started - endpoint_finished
+        if response_started is not None and self.finished is not None:
+            spans["after_response"] = self.finished - response_started
+        spans.update(self.phases)
+        return spans
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "phases_ms": {
+                name: round(seconds * 1000, 3)
+                for name, seconds in self.breakdown().items()
+            },
+            "counts": dict(self.counts),
+            "stacks": [
+                {"stack": stack, "samples": samples} for stack, samples in self.stacks
+            ],
+        }
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def record_phase(phase: str, seconds: float):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add(phase, seconds)
+
+
+class SlowRequestLog:
+    # Min-heap on duration: a new request only displaces the fastest kept one,
+    # and entries older than `window` seconds drop out so the log stays recent.
+
+    def __init__(self, size: int, window: float):
+        self.size = size
+        self.window = window
+        self._heap: list[tuple[float, int, float, RequestProfile]] = []
+        self._sequence = itertools.count()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window
+        if any(added_at < cutoff for _, _, added_at, _ in self._heap):
+            self._heap = [entry for entry in self._heap if entry[2] >= cutoff]
+            heapq.heapify(self._heap)
+
+    def add(self, profile: RequestProfile):
+        if self.size <= 0:
+            return
+        self._prune()
+        entry = (profile.duration, next(self._sequence), time.monotonic(), profile)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> list[RequestProfile]:
+        self._prune()
+        return [entry[3] for entry in sorted(self._heap, reverse=True)]
+
+    def clear(self):
+        self._heap.clear()
+
+
+slow_requests = SlowRequestLog(
+    size=settings.PROFILING_SLOW_REQUESTS, window=settings.PROFILING_WINDOW_S
+)
+
+
+class StackSampler:
+    # Samples the event loop thread, so requests running concurrently with the
+    # profiled one show up in its stacks too.
+
+    def __init__(self, thread_id: int, interval: float, max_depth: int = 40):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, top: int = 20) -> list[tuple[str, int]]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples.most_common(top)
+
+
+def requested_mode(scope) -> str | None:
+    if not settings.PROFILING_ENABLED:
+        return None
+    headers = dict(scope["headers"])
+    mode = headers.get(b"x-profile")
+    admin_key = headers.get(b"x-admin-key")
+    if (
+        mode in (b"1", b"stack")
+        and settings.ADMIN_API_KEY is not None
+        and admin_key is not None
+        and secrets.compare_digest(admin_key, settings.ADMIN_API_KEY.encode())
+    ):
+        return "stack" if mode == b"stack" else "phases"
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "phases"
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        sampler = None
+        if mode == "stack":
+            sampler = StackSampler(
+                threading.get_ident(), settings.PROFILING_STACK_INTERVAL_S
+            )
+            sampler.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                profile.mark("response_started")
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            profile.finished = time.perf_counter()
+            if sampler is not None:
+                profile.stacks = sampler.stop()
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            slow_requests.add(profile)
+
+
+class ProfiledRoute(APIRoute):
+    # Wraps the endpoint so a profile can tell dependency resolution before
+    # it from response serialization after it.
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                profile = current_profile.get()
+                if profile is None:
+                    return await endpoint(*args, **kwargs)
+                profile.mark("endpoint_started")
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    profile.mark("endpoint_finished")
+
+        else:
+
+            @functools.wraps(endpoint)
+            def timed_endpoint(*args, **kwargs):
+                profile = current_profile.get()
+                if profile is None:
+                    return endpoint(*args, **kwargs)
+                profile.mark("endpoint_started")
+                try:
+                    return endpoint(*args, **kwargs)
+                finally:
+                    profile.mark("endpoint_finished")
+
+        super().__init__(path, timed_endpoint, **kwargs)
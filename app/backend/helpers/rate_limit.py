@@ -0,0 +1,188 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import math
+from multiprocessing import shared_memory
+from pathlib import Path
+import struct
+import tempfile
+import time
+from fastapi import HTTPException, status
+from backend.config import settings
+
+
+class RateLimitStorage(ABC):
+    # Token buckets: each key holds `limit` tokens refilled evenly over
+    # `window` seconds. hit() takes one token and returns how long to wait
+    # when none is left (0.0 means allowed).
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float) -> float:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+def take_token(
+    tokens: float, updated_at: float, now: float, limit: int, window: float
+) -> tuple[float, float]:
+    rate = limit / window
+    tokens = min(limit, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryRateLimitStorage(RateLimitStorage):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (limit, now))
+        tokens, retry_after = take_token(tokens, updated_at, now, limit, window)
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SharedMemoryRateLimitStorage(RateLimitStorage):
+    # Fixed-size table in a named shared memory segment so every worker on the
+    # host sees the same buckets. Keys hash to a slot with a secret key, so
+    # collisions cannot be computed offline, and colliding keys share the
+    # slot's bucket rather than resetting it. A Redis backend only needs to
+    # implement hit() and clear().
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, name: str, slots: int, key: bytes):
+        self.slots = slots
+        self.key = key
+        size = slots * self.SLOT.size
+        try:
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True, size=size, track=False
+            )
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        self._lock_path = Path(tempfile.gettempdir()) / f"{name}.lock"
+
+    @contextmanager
+    def _locked(self):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8, key=self.key).digest(),
+            "little",
+        )
+        offset = (digest % self.slots) * self.SLOT.size
+        with self._locked():
+            now = time.time()
+            stored, tokens, updated_at = self.SLOT.unpack_from(self._shm.buf, offset)
+            if not stored:
+                tokens, updated_at = limit, now
+            tokens, retry_after = take_token(tokens, updated_at, now, limit, window)
+            self.SLOT.pack_into(self._shm.buf, offset, digest, tokens, now)
+        return retry_after
+
+    def clear(self):
+        with self._locked():
+            self._shm.buf[:] = bytes(len(self._shm.buf))
+
+    def close(self):
+        self._shm.close()
+
+
+class LoginRateLimiter:
+    def __init__(
+        self,
+        storage: RateLimitStorage,
+        email_limit: int,
+        ip_limit: int,
+        window: float,
+    ):
+        self.storage = storage
+        self.email_limit = email_limit
+        self.ip_limit = ip_limit
+        self.window = window
+        self.allowed = 0
+        self.rejected_by_ip = 0
+        self.rejected_by_email = 0
+
+    def check(self, email: str, client_ip: str | None):
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+
+        if client_ip is not None:
+            retry_after = self.storage.hit(
+                f"ip:{client_ip}", self.ip_limit, self.window
+            )
+            if retry_after:
+                self.rejected_by_ip += 1
+                raise too_many_attempts(retry_after)
+
+        retry_after = self.storage.hit(
+            f"email:{email.lower()}", self.email_limit, self.window
+        )
+        if retry_after:
+            self.rejected_by_email += 1
+            raise too_many_attempts(retry_after)
+
+        self.allowed += 1
+
+    def reset(self):
+        self.storage.clear()
+        self.allowed = 0
+        self.rejected_by_ip = 0
+        self.rejected_by_email = 0
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "rejected_by_ip": self.rejected_by_ip,
+            "rejected_by_email": self.rejected_by_email,
+        }
+
+
+def too_many_attempts(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, try again later",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+def create_rate_limit_storage() -> RateLimitStorage:
+    if settings.LOGIN_RATE_LIMIT_BACKEND == "shared":
+        return SharedMemoryRateLimitStorage(
+            settings.LOGIN_RATE_LIMIT_SHM_NAME,
+            settings.LOGIN_RATE_LIMIT_SLOTS,
+            key=hashlib.blake2b(
+                settings.SECRET_KEY.encode(), digest_size=32, person=b"login-limits"
+            ).digest(),
+        )
+    return MemoryRateLimitStorage(maxsize=settings.LOGIN_RATE_LIMIT_SLOTS)
+
+
+login_rate_limiter = LoginRateLimiter(
+    create_rate_limit_storage(),
+    email_limit=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+    ip_limit=settings.LOGIN_RATE_LIMIT_PER_IP,
+    window=settings.LOGIN_RATE_LIMIT_WINDOW_S,
+)
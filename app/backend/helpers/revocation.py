@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import backend.database.models as models
+from backend.helpers.invalidation import invalidation_bus
+from backend.config import settings
+
+EPOCH_TOPIC = "epoch"
+
+
+class RevocationEpochCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.value = 0.0
+        self._loaded_at: float | None = None
+
+    async def get(self, db: AsyncSession) -> float:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            revoked_before = await db.scalar(
+                select(models.RevocationEpoch.revoked_before).where(
+                    models.RevocationEpoch.id == 1
+                )
+            )
+            self.set(epoch_seconds(revoked_before) if revoked_before else 0.0)
+        return self.value
+
+    def set(self, value: float):
+        self.value = value
+        self._loaded_at = time.monotonic()
+
+    def clear(self):
+        self.value = 0.0
+        self._loaded_at = None
+
+    async def is_revoked(self, payload: dict, db: AsyncSession) -> bool:
+        return issued_before_epoch(payload, await self.get(db))
+
+
+def issued_before_epoch(payload: dict, epoch: float) -> bool:
+    if not epoch:
+        return False
+    issued_at = payload.get("iat")
+    return not isinstance(issued_at, (int, float)) or issued_at < epoch
+
+
+def epoch_seconds(revoked_before: datetime) -> float:
+    # SQLite hands back naive datetimes; the column is always written in UTC.
+    if revoked_before.tzinfo is None:
+        revoked_before = revoked_before.replace(tzinfo=timezone.utc)
+    return revoked_before.timestamp()
+
+
+revocation_epoch = RevocationEpochCache(ttl=settings.REVOCATION_EPOCH_TTL_S)
+
+
+async def revoke_all_sessions(db: AsyncSession) -> datetime:
+    revoked_before = datetime.now(timezone.utc)
+    await db.merge(models.RevocationEpoch(id=1, revoked_before=revoked_before))
+    await db.commit()
+    invalidation_bus.publish(EPOCH_TOPIC, str(epoch_seconds(revoked_before)))
+    return revoked_before
+
+
+def _on_epoch_changed(payload: str):
+    revocation_epoch.set(float(payload))
+
+
+invalidation_bus.subscribe(EPOCH_TOPIC, _on_epoch_changed)
@@ -0,0 +1,115 @@
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import backend.database.models as models
+from backend.helpers.cache import TTLCache
+from backend.helpers.invalidation import invalidation_bus
+from backend.config import settings
+
+SESSION_TOPIC = "session"
+
+# A session is live while its family still has an unconsumed refresh token;
+# logout, eviction and replay detection all delete the family, so the database
+# is the record of revocation. Live session ids are cached for
+# AUTH_CACHE_TTL_S, and a revocation drops them from every worker's cache.
+live_sessions = TTLCache(
+    maxsize=settings.SESSION_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_S
+)
+
+
+def session_started(session_id: str):
+    live_sessions.set(session_id, True)
+
+
+async def find_revoked_sessions(session_ids: set[str], db: AsyncSession) -> set[str]:
+    unknown = {
+        session_id
+        for session_id in session_ids
+        if live_sessions.get(session_id) is None
+    }
+    if not unknown:
+        return set()
+
+    with ExitStack() as stack:
+        loads = {
+            session_id: stack.enter_context(live_sessions.loading(session_id))
+            for session_id in unknown
+        }
+        live = set(
+            await db.scalars(
+                select(models.RefreshToken.family_id)
+                .where(
+                    models.RefreshToken.family_id.in_(unknown),
+                    models.RefreshToken.consumed_at.is_(None),
+                )
+                .distinct()
+            )
+        )
+        for session_id in live:
+            loads[session_id].set(True)
+    return unknown - live
+
+
+async def is_session_revoked(payload: dict, db: AsyncSession) -> bool:
+    session_id = payload.get("sid")
+    return session_id is not None and bool(
+        await find_revoked_sessions({session_id}, db)
+    )
+
+
+def live_sessions_query(user_id: int):
+    return (
+        select(models.RefreshToken)
+        .where(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.consumed_at.is_(None),
+            models.RefreshToken.expires_at > datetime.now(timezone.utc),
+        )
+        .order_by(models.RefreshToken.expires_at.desc())
+    )
+
+
+async def evict_sessions(
+    user_id: int, db: AsyncSession, device_id: str | None = None
+) -> list[str]:
+    sessions = (await db.scalars(live_sessions_query(user_id))).all()
+    kept = 0
+    evicted = []
+    for session in sessions:
+        if device_id is not None and session.device_id == device_id:
+            evicted.append(session.family_id)
+        elif kept < settings.MAX_SESSIONS_PER_USER - 1:
+            kept += 1
+        else:
+            evicted.append(session.family_id)
+
+    if evicted:
+        await delete_sessions(user_id, evicted, db)
+    return evicted
+
+
+async def delete_sessions(
+    user_id: int, session_ids: list[str], db: AsyncSession
+) -> int:
+    result = await db.execute(
+        delete(models.RefreshToken)
+        .where(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.family_id.in_(session_ids),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def revoke_sessions(session_ids: list[str]):
+    for session_id in session_ids:
+        invalidation_bus.publish(SESSION_TOPIC, session_id)
+
+
+def _on_session_revoked(session_id: str):
+    live_sessions.pop(session_id)
+
+
+invalidation_bus.subscribe(SESSION_TOPIC, _on_session_revoked)
@@ -0,0 +1,85 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import logging
+import time
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import backend.database.models as models
+from backend.helpers.metrics import (
+    refresh_token_sweep_batch_duration,
+    refresh_tokens_purged,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepStats:
+    runs: int = 0
+    batches: int = 0
+    rows_purged: int = 0
+    last_run_purged: int = 0
+    last_batch_duration_s: float = 0.0
+    max_batch_duration_s: float = 0.0
+
+
+sweep_stats = SweepStats()
+
+
+async def purge_expired_refresh_tokens(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int,
+    max_batches: int | None = None,
+) -> int:
+    purged = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = (
+            select(models.RefreshToken.jti)
+            .where(models.RefreshToken.expires_at <= datetime.now(timezone.utc))
+            .limit(batch_size)
+        )
+
+        started = time.perf_counter()
+        async with session_factory() as session:
+            result = await session.execute(
+                delete(models.RefreshToken)
+                .where(models.RefreshToken.jti.in_(expired))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        duration = time.perf_counter() - started
+
+        batches += 1
+        purged += result.rowcount
+        refresh_token_sweep_batch_duration.observe((), duration)
+        refresh_tokens_purged.inc((), result.rowcount)
+        sweep_stats.batches += 1
+        sweep_stats.last_batch_duration_s = duration
+        sweep_stats.max_batch_duration_s = max(
+            sweep_stats.max_batch_duration_s, duration
+        )
+
+        if result.rowcount < batch_size:
+            break
+
+    sweep_stats.runs += 1
+    sweep_stats.rows_purged += purged
+    sweep_stats.last_run_purged = purged
+    return purged
+
+
+async def run_refresh_token_sweeper(
+    session_factory: async_sessionmaker[AsyncSession],
+    interval_s: float,
+    batch_size: int,
+):
+    while True:
+        try:
+            purged = await purge_expired_refresh_tokens(session_factory, batch_size)
+            if purged:
+                logger.info("Purged %d expired refresh tokens", purged)
+        except Exception:
+            logger.exception("Refresh token sweep failed")
+        await asyncio.sleep(interval_s)
@@ -1,46 +1,137 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+import hashlib
+import math
+import time
 import uuid
 from fastapi import HTTPException, status
 import jwt
+from sqlalchemy import Row, delete, select, update
 from backend.database.database import DB_SESSION
 import backend.database.models as models
+from backend.helpers import keys
+from backend.helpers.cache import TTLCache
+from backend.helpers.metrics import jwt_duration, watch_cache
+from backend.helpers.profiling import record_phase
 from backend.config import settings
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+watch_cache("token", token_cache)
 
-def create_access_token(
+
+@dataclass(frozen=True, slots=True)
+class MintedToken:
+    token: str
+    claims: dict
+
+    @property
+    def jti(self) -> str | None:
+        return self.claims.get("jti")
+
+    @property
+    def expires_at(self) -> datetime:
+        return datetime.fromtimestamp(self.claims["exp"], tz=timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class TokenPair:
+    access: MintedToken
+    refresh: MintedToken
+
+
+def mint_token(
     data: dict,
     is_refresh_token: bool = False,
     access_token_delta_m: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
     refresh_token_delta_d: timedelta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
-):
-    to_encode = data.copy()
+) -> MintedToken:
+    now = datetime.now(timezone.utc)
+    # Millisecond iat lets a revocation epoch separate tokens issued within
+    # the same second; flooring never dates a token after its real issue time.
+    claims = data.copy()
+    claims["iat"] = math.floor(now.timestamp() * 1000) / 1000
 
     if not is_refresh_token:
-        expire = datetime.now(timezone.utc) + access_token_delta_m
-        to_encode.update({"exp": expire})
+        expire = now + access_token_delta_m
+        claims["exp"] = int(expire.timestamp())
     else:
-        expire = datetime.now(timezone.utc) + refresh_token_delta_d
-        to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
+        expire = now + refresh_token_delta_d
+        claims.update({"exp": int(expire.timestamp()), "jti": str(uuid.uuid4())})
 
+    signing_key = keys.key_ring.active
+    started = time.perf_counter()
     encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        claims,
+        signing_key.private_key,
+        algorithm=keys.key_ring.algorithm,
+        headers={"kid": signing_key.kid} if signing_key.kid else None,
     )
-    return encoded_jwt
+    elapsed = time.perf_counter() - started
+    jwt_duration.observe(("encode",), elapsed)
+    record_phase("jwt", elapsed)
+    return MintedToken(token=encoded_jwt, claims=claims)
+
+
+def decode_token(token: str) -> dict:
+    if not settings.TOKEN_CACHE_ENABLED:
+        return _verify_token(token)
+
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is None:
+        payload = _verify_token(token)
+        # Refresh tokens are used once; caching them only evicts access tokens.
+        if "exp" in payload and "jti" not in payload:
+            token_cache.set(digest, payload, ttl=payload["exp"] - time.time())
+    return dict(payload)
+
+
+def _verify_token(token: str) -> dict:
+    key_ring = keys.key_ring
+    kid = None
+    started = time.perf_counter()
+    try:
+        if key_ring.is_asymmetric:
+            kid = jwt.get_unverified_header(token).get("kid")
+        return jwt.decode(
+            token, key_ring.verification_key(kid), algorithms=[key_ring.algorithm]
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        jwt_duration.observe(("decode",), elapsed)
+        record_phase("jwt", elapsed)
+
+
+def create_token_pair(data: dict) -> TokenPair:
+    return TokenPair(
+        access=mint_token(data), refresh=mint_token(data, is_refresh_token=True)
+    )
+
+
+def create_access_token(
+    data: dict,
+    is_refresh_token: bool = False,
+    access_token_delta_m: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    refresh_token_delta_d: timedelta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+):
+    return mint_token(
+        data, is_refresh_token, access_token_delta_m, refresh_token_delta_d
+    ).token
 
 
-async def get_refresh_token_payload(token: str, db: DB_SESSION):
+def decode_refresh_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired refresh token",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
     except jwt.InvalidTokenError:
         raise credentials_exception
 
@@ -51,12 +142,55 @@ async def get_refresh_token_payload(token: str, db: DB_SESSION):
     if not jti or not user_id or version is None:
         raise credentials_exception
     try:
-        target_id = int(user_id)
+        int(user_id)
+        uuid.UUID(str(version))
     except (ValueError, TypeError):
         raise credentials_exception
 
-    user = await db.get(models.User, target_id)
-    if not user or str(version) != str(user.token_version):
-        raise credentials_exception
-
     return payload
+
+
+async def consume_refresh_token(payload: dict, db: DB_SESSION) -> Row | None:
+    user_id = int(payload["sub"])
+    now = datetime.now(timezone.utc)
+    user_is_current = (
+        select(models.User.id)
+        .where(
+            models.User.id == user_id,
+            models.User.token_version == uuid.UUID(str(payload["version"])),
+        )
+        .exists()
+    )
+
+    result = await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.jti == payload["jti"],
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.consumed_at.is_(None),
+            models.RefreshToken.expires_at > now,
+            user_is_current,
+        )
+        .values(consumed_at=now)
+        .returning(models.RefreshToken.family_id, models.RefreshToken.device_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first()
+
+
+async def revoke_token_family(jti: str, db: DB_SESSION) -> str | None:
+    replayed_family = (
+        select(models.RefreshToken.family_id)
+        .where(
+            models.RefreshToken.jti == jti,
+            models.RefreshToken.consumed_at.is_not(None),
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        delete(models.RefreshToken)
+        .where(models.RefreshToken.family_id == replayed_family)
+        .returning(models.RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalars().first()
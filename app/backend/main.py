@@ -1,19 +1,81 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
 import sys
 from fastapi import FastAPI
-from backend.routers import users, auth
-from backend.database.database import create_db_tables, engine
+from backend.config import settings
+from backend.routers import admin, metrics, users, auth, well_known
+from backend.database.database import (
+    SessionLocal,
+    create_db_tables,
+    engine,
+    read_engine,
+    warm_up_pool,
+)
+from backend.helpers.credentials import hashing_pool
+from backend.helpers.email_filter import email_filter, run_email_filter_sync
+from backend.helpers.invalidation import invalidation_bus
+from backend.helpers.metrics import MetricsMiddleware, registry, run_metrics_flusher
+from backend.helpers.profiling import ProfilingMiddleware
+from backend.helpers.token_sweeper import run_refresh_token_sweeper
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    sweeper = None
+    metrics_flusher = None
+    email_filter_sync = None
     if "pytest" not in sys.modules:
         await create_db_tables()
+        await warm_up_pool(engine, settings.DB_POOL_SIZE)
+        if read_engine is not None:
+            await warm_up_pool(read_engine, settings.DB_POOL_SIZE)
+        if settings.REFRESH_TOKEN_SWEEP_INTERVAL_S > 0:
+            sweeper = asyncio.create_task(
+                run_refresh_token_sweeper(
+                    SessionLocal,
+                    settings.REFRESH_TOKEN_SWEEP_INTERVAL_S,
+                    settings.REFRESH_TOKEN_SWEEP_BATCH_SIZE,
+                )
+            )
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        metrics_flusher = asyncio.create_task(
+            run_metrics_flusher(
+                Path(settings.METRICS_DIR), settings.METRICS_FLUSH_INTERVAL_S
+            )
+        )
+    await invalidation_bus.start()
+    # Loaded after the bus starts so registrations on other workers during the
+    # load are not missed.
+    if settings.EMAIL_FILTER_ENABLED and "pytest" not in sys.modules:
+        await email_filter.load(SessionLocal)
+        if settings.EMAIL_FILTER_SYNC_INTERVAL_S > 0:
+            email_filter_sync = asyncio.create_task(
+                run_email_filter_sync(settings.EMAIL_FILTER_SYNC_INTERVAL_S)
+            )
     yield
+    for task in (sweeper, metrics_flusher, email_filter_sync):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if metrics_flusher is not None:
+        registry.write_snapshot(Path(settings.METRICS_DIR))
+    await invalidation_bus.stop()
+    hashing_pool.shutdown()
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(users.router)
 app.include_router(auth.router)
+app.include_router(well_known.router)
+app.include_router(admin.router)
+
+app.add_middleware(ProfilingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
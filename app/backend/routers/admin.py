@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, status
+from backend.database.database import DB_SESSION
+from backend.helpers.credentials import verify_admin_key
+from backend.helpers.email_filter import email_filter
+from backend.helpers.profiling import ProfiledRoute, slow_requests
+from backend.helpers.rate_limit import login_rate_limiter
+from backend.helpers.revocation import revoke_all_sessions
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_admin_key)],
+    route_class=ProfiledRoute,
+)
+
+
+@router.post("/revoke-all-sessions", status_code=status.HTTP_200_OK)
+async def revoke_all(db: DB_SESSION):
+    revoked_before = await revoke_all_sessions(db)
+    return {
+        "detail": "All sessions revoked",
+        "revoked_before": revoked_before.isoformat(),
+    }
+
+
+@router.get("/login-rate-limits", status_code=status.HTTP_200_OK)
+async def login_rate_limits():
+    return login_rate_limiter.stats()
+
+
+@router.get("/email-filter", status_code=status.HTTP_200_OK)
+async def email_filter_stats():
+    return email_filter.stats()
+
+
+@router.get("/slow-requests", status_code=status.HTTP_200_OK)
+async def slow_request_log():
+    return [profile.to_dict() for profile in slow_requests.slowest()]
@@ -1,112 +1,269 @@
-from datetime import datetime, timezone
 from typing import Annotated
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 import jwt
-from sqlalchemy import delete, select
-from backend.database.database import DB_SESSION
+from sqlalchemy import delete, select, update
+from backend.database.database import DB_READ_SESSION, DB_SESSION, session_for_users
 import backend.database.models as models
 import backend.database.schemas as schemas
-from backend.helpers.get_current_user import CURRENT_USER
-from backend.helpers.tokens import create_access_token, get_refresh_token_payload
-from backend.helpers.credentials import verify_password
-from backend.config import settings
+from backend.helpers.auth_cache import get_cached_user, invalidate_user
+from backend.helpers.email_filter import email_filter
+from backend.helpers.get_current_user import CURRENT_USER_ID, oauth2_scheme
+from backend.helpers.tokens import (
+    consume_refresh_token,
+    create_token_pair,
+    decode_refresh_token,
+    decode_token,
+    revoke_token_family,
+)
+from backend.helpers.credentials import (
+    needs_rehash,
+    rehash_password,
+    verify_introspection_key,
+    verify_password_async,
+)
+from backend.helpers.profiling import ProfiledRoute
+from backend.helpers.rate_limit import login_rate_limiter
+from backend.helpers.revocation import issued_before_epoch, revocation_epoch
+from backend.helpers.sessions import (
+    delete_sessions,
+    evict_sessions,
+    find_revoked_sessions,
+    live_sessions_query,
+    revoke_sessions,
+    session_started,
+)
 
-router = APIRouter(prefix="/auth", tags=["auth (to authorize use email not username)"])
+router = APIRouter(
+    prefix="/auth",
+    tags=["auth (to authorize use email not username)"],
+    route_class=ProfiledRoute,
+)
 
 
 @router.post("/login", response_model=schemas.Tokens, status_code=status.HTTP_200_OK)
 async def login(
-    form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: DB_SESSION
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: DB_SESSION,
+    x_device_id: Annotated[str | None, Header(max_length=64)] = None,
 ):
-    user = await db.scalar(
-        select(models.User).where(models.User.email == form_data.username)
+    login_rate_limiter.check(
+        form_data.username, request.client.host if request.client else None
     )
-    if not user or not verify_password(form_data.password, user.password):
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
-
-    user.token_version = uuid.uuid4()
-    db.add(user)
 
-    await db.execute(
-        delete(models.RefreshToken).where(models.RefreshToken.user_id == user.id)
-    )
+    user = None
+    if not await email_filter.is_absent(form_data.username):
+        user = await db.scalar(
+            select(models.User).where(models.User.email == form_data.username)
+        )
+    if not user or not await verify_password_async(
+        form_data.password, user.password
+    ):
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if needs_rehash(user.password):
+        background_tasks.add_task(
+            rehash_password, db.bind, user.id, form_data.password, user.password
+        )
 
-    token_data = {"sub": str(user.id), "version": str(user.token_version)}
-    access_token = create_access_token(token_data)
-    refresh_token = create_access_token(token_data, is_refresh_token=True)
+    evicted = await evict_sessions(user.id, db, device_id=x_device_id)
 
-    refresh_payload = jwt.decode(
-        refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    session_id = str(uuid.uuid4())
+    tokens = create_token_pair(
+        {"sub": str(user.id), "version": str(user.token_version), "sid": session_id}
     )
     db.add(
         models.RefreshToken(
-            jti=refresh_payload["jti"],
+            jti=tokens.refresh.jti,
+            family_id=session_id,
             user_id=user.id,
-            expires_at=datetime.fromtimestamp(refresh_payload["exp"], tz=timezone.utc),
+            device_id=x_device_id,
+            expires_at=tokens.refresh.expires_at,
         )
     )
 
     await db.commit()
+    revoke_sessions(evicted)
+    session_started(session_id)
 
     return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
+        "access_token": tokens.access.token,
+        "refresh_token": tokens.refresh.token,
         "token_type": "bearer",
     }
 
 
 @router.post("/refresh", response_model=schemas.Tokens, status_code=status.HTTP_200_OK)
 async def refresh(data: schemas.RefreshRequest, db: DB_SESSION):
-    payload = await get_refresh_token_payload(data.refresh_token, db)
-    jti = payload["jti"]
+    revoked_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked or invalid"
+    )
+    payload = decode_refresh_token(data.refresh_token)
     user_id = int(payload["sub"])
+    if await revocation_epoch.is_revoked(payload, db):
+        raise revoked_exception
 
-    existing = await db.scalar(
-        select(models.RefreshToken).where(
-            models.RefreshToken.jti == jti, models.RefreshToken.user_id == user_id
-        )
+    consumed = await consume_refresh_token(payload, db)
+    if consumed is None:
+        family_id = await revoke_token_family(payload["jti"], db)
+        if family_id is not None:
+            await db.commit()
+            revoke_sessions([family_id])
+        raise revoked_exception
+
+    tokens = create_token_pair(
+        {"sub": str(user_id), "version": payload["version"], "sid": consumed.family_id}
     )
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked or invalid"
+    db.add(
+        models.RefreshToken(
+            jti=tokens.refresh.jti,
+            family_id=consumed.family_id,
+            user_id=user_id,
+            device_id=consumed.device_id,
+            expires_at=tokens.refresh.expires_at,
         )
-
-    await db.delete(existing)
-    user = await db.get(models.User, user_id)
-    user_data = {"sub": str(user_id), "version": str(user.token_version)}
-
-    access_token = create_access_token(user_data)
-    new_refresh_token = create_access_token(user_data, is_refresh_token=True)
-
-    new_payload = jwt.decode(
-        new_refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
     )
-    new_jti = new_payload["jti"]
-    exp_timestamp = new_payload["exp"]
-    expires_at = datetime.fromtimestamp(exp_timestamp, tz=timezone.utc)
-
-    db.add(models.RefreshToken(jti=new_jti, user_id=user_id, expires_at=expires_at))
     await db.commit()
+    session_started(consumed.family_id)
 
     return {
-        "access_token": access_token,
-        "refresh_token": new_refresh_token,
+        "access_token": tokens.access.token,
+        "refresh_token": tokens.refresh.token,
         "token_type": "bearer",
     }
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout(current_user: CURRENT_USER, db: DB_SESSION):
+async def logout(current_user_id: CURRENT_USER_ID, db: DB_SESSION):
     await db.execute(
         delete(models.RefreshToken).where(
-            models.RefreshToken.user_id == current_user.id
+            models.RefreshToken.user_id == current_user_id
         )
     )
-    current_user.token_version = uuid.uuid4()
-    db.add(current_user)
-    await db.refresh(current_user)
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == current_user_id)
+        .values(token_version=uuid.uuid4())
+    )
     await db.commit()
+    invalidate_user(current_user_id)
 
     return {"detail": "Successfully logged out"}
+
+
+@router.get(
+    "/sessions",
+    response_model=list[schemas.SessionDisplay],
+    status_code=status.HTTP_200_OK,
+)
+async def list_sessions(
+    current_user_id: CURRENT_USER_ID,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: DB_SESSION,
+):
+    current_session = decode_token(token).get("sid")
+    sessions = await db.scalars(live_sessions_query(current_user_id))
+    return [
+        {
+            "id": session.family_id,
+            "device_id": session.device_id,
+            "expires_at": session.expires_at,
+            "current": session.family_id == current_session,
+        }
+        for session in sessions
+    ]
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_200_OK)
+async def delete_session(
+    session_id: str, current_user_id: CURRENT_USER_ID, db: DB_SESSION
+):
+    if not await delete_sessions(current_user_id, [session_id], db):
+        raise HTTPException(status_code=404, detail="Session not found")
+    await db.commit()
+    revoke_sessions([session_id])
+
+    return {"detail": "Session logged out"}
+
+
+@router.post(
+    "/introspect",
+    response_model=schemas.IntrospectResponse,
+    response_model_exclude_none=True,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_introspection_key)],
+)
+async def introspect(
+    request: schemas.IntrospectRequest, db: DB_SESSION, read_db: DB_READ_SESSION
+):
+    decoded: list[tuple[int, dict] | None] = []
+    for token in request.tokens:
+        try:
+            payload = decode_token(token)
+            decoded.append((int(payload["sub"]), payload))
+        except (jwt.InvalidTokenError, KeyError, ValueError, TypeError):
+            decoded.append(None)
+            continue
+        # Refresh tokens are single-use and never bearer credentials.
+        if "jti" in payload:
+            decoded[-1] = None
+
+    epoch = await revocation_epoch.get(db)
+    revoked = await find_revoked_sessions(
+        {entry[1]["sid"] for entry in decoded if entry and "sid" in entry[1]}, db
+    )
+    decoded = [
+        (
+            None
+            if entry is None
+            or issued_before_epoch(entry[1], epoch)
+            or entry[1].get("sid") in revoked
+            else entry
+        )
+        for entry in decoded
+    ]
+
+    versions: dict[int, str] = {}
+    user_ids = {entry[0] for entry in decoded if entry is not None}
+    for user_id in user_ids:
+        cached = get_cached_user(user_id)
+        if cached is not None:
+            versions[user_id] = cached.token_version
+
+    missing = user_ids - versions.keys()
+    if missing:
+        session = session_for_users(missing, db, read_db)
+        rows = await session.execute(
+            select(models.User.id, models.User.token_version).where(
+                models.User.id.in_(missing)
+            )
+        )
+        versions.update({id: str(token_version) for id, token_version in rows})
+
+    results = []
+    for entry in decoded:
+        if entry is None or versions.get(entry[0]) != entry[1].get("version"):
+            results.append({"active": False})
+            continue
+        user_id, payload = entry
+        results.append(
+            {
+                "active": True,
+                "sub": str(user_id),
+                "exp": payload.get("exp"),
+                "iat": payload.get("iat"),
+                "token_type": "access_token",
+            }
+        )
+
+    return {"results": results}
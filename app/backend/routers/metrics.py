@@ -0,0 +1,17 @@
+from pathlib import Path
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from backend.helpers.metrics import registry
+from backend.config import settings
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get(
+    "/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK
+)
+async def metrics():
+    directory = Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+    return PlainTextResponse(
+        registry.render(directory), media_type="text/plain; version=0.0.4"
+    )
@@ -1,29 +1,110 @@
+import csv
+import io
+import json
+from typing import Annotated, Literal
 import uuid
-from fastapi import APIRouter, HTTPException, Response, status
-from sqlalchemy import select
-from backend.database.database import DB_SESSION
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete as sql_delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.database import (
+    DB_READ_SESSION,
+    DB_SESSION,
+    insert_ignoring_conflicts,
+    session_for_user,
+)
 import backend.database.models as models
 import backend.database.schemas as schemas
-from backend.helpers.get_current_user import CURRENT_USER
-from backend.helpers.credentials import hash_password, verify_password, compare_ids
-
-router = APIRouter(
-    prefix="/users", tags=["users"]
+from backend.helpers.auth_cache import invalidate_user
+from backend.helpers.email_filter import email_filter, email_registered, email_removed
+from backend.helpers.get_current_user import CURRENT_USER, CURRENT_USER_CONTEXT
+from backend.helpers.profiling import ProfiledRoute
+from backend.helpers.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
+from backend.helpers.credentials import (
+    hash_password_async,
+    hash_passwords_async,
+    verify_password_async,
+    compare_ids,
+    verify_admin_key,
 )
 
+router = APIRouter(prefix="/users", tags=["users"], route_class=ProfiledRoute)
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMAT = Annotated[Literal["ndjson", "csv"], Query(alias="format")]
+
+
+@router.get("/", response_model=schemas.UserPage, status_code=status.HTTP_200_OK)
+async def get_all(
+    db: DB_READ_SESSION,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    after_id = decode_cursor(cursor) if cursor else 0
+    result = await db.execute(
+        select(models.User.id, models.User.username, models.User.email)
+        .where(models.User.id > after_id)
+        .order_by(models.User.id)
+        .limit(limit + 1)
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+
+    return {"items": [row._mapping for row in rows], "next_cursor": next_cursor}
+
+
+async def stream_users(db: AsyncSession, export_format: str):
+    result = await db.stream(
+        select(models.User.id, models.User.username, models.User.email)
+        .order_by(models.User.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    if export_format == "csv":
+        yield "id,username,email\r\n"
+    async for rows in result.partitions():
+        if export_format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps({"id": id, "username": username, "email": email}) + "\n"
+                for id, username, email in rows
+            )
+
 
 @router.get(
-    "/", response_model=list[schemas.UserDisplay], status_code=status.HTTP_200_OK
+    "/export",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_admin_key)],
 )
-async def get_all(db: DB_SESSION):
-    result = await db.scalars(select(models.User))
-    users = result.all()
-    return users
+async def export(
+    db: DB_READ_SESSION,
+    export_format: EXPORT_FORMAT = "ndjson",
+):
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_users(db, export_format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="users.{export_format}"'
+        },
+    )
 
 
 @router.get("/{id}", response_model=schemas.UserDisplay, status_code=status.HTTP_200_OK)
-async def get_one(id: int, db: DB_SESSION):
-    user = await db.get(models.User, id)
+async def get_one(id: int, db: DB_SESSION, read_db: DB_READ_SESSION):
+    user = await session_for_user(id, db, read_db).get(models.User, id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -35,22 +116,99 @@ async def get_one(id: int, db: DB_SESSION):
     "/", response_model=schemas.UserDisplay, status_code=status.HTTP_201_CREATED
 )
 async def create(request: schemas.UserRegister, db: DB_SESSION):
-    user = await db.scalar(
-        select(models.User).where(models.User.email == request.email)
+    user_exists_exception = HTTPException(
+        status_code=status.HTTP_226_IM_USED, detail="User already exists"
     )
-    if not user:
-        hashed_password = hash_password(request.password.get_secret_value())
-        new_user = models.User(
-            username=request.username, email=request.email, password=hashed_password
+
+    if email_filter.might_contain(request.email):
+        existing_id = await db.scalar(
+            select(models.User.id).where(models.User.email == request.email).limit(1)
         )
-        db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
-        return new_user
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_226_IM_USED, detail="User already exists"
+        if existing_id is not None:
+            raise user_exists_exception
+
+    hashed_password = await hash_password_async(request.password.get_secret_value())
+    new_id = await db.scalar(
+        insert_ignoring_conflicts(models.User, db, "email")
+        .values(
+            username=request.username,
+            email=request.email,
+            password=hashed_password,
+            token_version=uuid.uuid4(),
         )
+        .returning(models.User.id)
+    )
+    if new_id is None:
+        raise user_exists_exception
+    await db.commit()
+    invalidate_user(new_id)
+    email_registered(request.email)
+
+    return {"id": new_id, "username": request.username, "email": request.email}
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.UserBulkResult,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_admin_key)],
+)
+async def bulk_create(request: schemas.UserBulkRegister, db: DB_SESSION):
+    results: dict[int, dict] = {}
+    pending: dict[str, schemas.UserRegister] = {}
+    for index, user in enumerate(request.users):
+        if user.email in pending:
+            results[index] = {"email": user.email, "status": "duplicate"}
+        else:
+            pending[user.email] = user
+
+    maybe_existing = [email for email in pending if email_filter.might_contain(email)]
+    if maybe_existing:
+        existing = await db.scalars(
+            select(models.User.email).where(models.User.email.in_(maybe_existing))
+        )
+        for email in existing:
+            del pending[email]
+
+    hashed = await hash_passwords_async(
+        [user.password.get_secret_value() for user in pending.values()]
+    )
+    created: dict[str, int] = {}
+    if pending:
+        rows = await db.execute(
+            insert_ignoring_conflicts(models.User, db, "email").returning(
+                models.User.id, models.User.email
+            ),
+            [
+                {
+                    "username": user.username,
+                    "email": user.email,
+                    "password": password,
+                    "token_version": uuid.uuid4(),
+                }
+                for user, password in zip(pending.values(), hashed)
+            ],
+        )
+        created = {email: id for id, email in rows}
+        await db.commit()
+        for email in created:
+            email_registered(email)
+
+    for index, user in enumerate(request.users):
+        if index not in results:
+            if user.email in created:
+                results[index] = {
+                    "email": user.email,
+                    "status": "created",
+                    "id": created[user.email],
+                }
+            else:
+                results[index] = {"email": user.email, "status": "exists"}
+
+    return {
+        "created": len(created),
+        "results": [results[index] for index in range(len(request.users))],
+    }
 
 
 @router.put(
@@ -58,13 +216,13 @@ async def create(request: schemas.UserRegister, db: DB_SESSION):
 )
 async def change_password(
     id: int,
-    current_user: CURRENT_USER,
+    context: CURRENT_USER_CONTEXT,
     request: schemas.UserChangePassword,
     db: DB_SESSION,
 ):
-    compare_ids(current_user.id, id)
+    compare_ids(context.user.id, id)
 
-    user = await db.get(models.User, id)
+    user = await context.load()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -72,30 +230,32 @@ async def change_password(
 
     old_password_plain = request.old_password.get_secret_value()
     new_password_plain = request.new_password.get_secret_value()
-    if not verify_password(old_password_plain, user.password):
+    if not await verify_password_async(old_password_plain, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect old password"
         )
 
-    user.password = hash_password(new_password_plain)
+    user.password = await hash_password_async(new_password_plain)
     user.token_version = uuid.uuid4()
-
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
+    invalidate_user(id)
 
-    return user
+    return {"id": id, "username": context.user.username, "email": context.user.email}
 
 
 @router.delete("/{id}")
 async def delete(id: int, current_user: CURRENT_USER, db: DB_SESSION):
     compare_ids(current_user.id, id)
-    user = await db.get(models.User, id)
-    if not user:
+    await db.execute(
+        sql_delete(models.RefreshToken).where(models.RefreshToken.user_id == id)
+    )
+    result = await db.execute(sql_delete(models.User).where(models.User.id == id))
+    if not result.rowcount:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    await db.delete(user)
     await db.commit()
+    invalidate_user(id)
+    email_removed(current_user.email)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
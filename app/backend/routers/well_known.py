@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.helpers import keys
+from backend.helpers.profiling import ProfiledRoute
+from backend.config import settings
+
+router = APIRouter(prefix="/.well-known", tags=["keys"], route_class=ProfiledRoute)
+
+
+@router.get("/jwks.json")
+async def jwks():
+    return JSONResponse(
+        keys.key_ring.jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_S}"},
+    )
@@ -1,9 +1,18 @@
+from contextvars import ContextVar
 from asgi_lifespan import LifespanManager
 from httpx import ASGITransport, AsyncClient
 import pytest
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import StaticPool, text
-from backend.database.database import Base, get_db
+from sqlalchemy import StaticPool, event, text
+from backend.database.database import Base, get_db, recent_writers
+from backend.helpers.auth_cache import auth_cache
+from backend.helpers.email_filter import email_filter
+from backend.helpers.metrics import instrument_engine, registry
+from backend.helpers.profiling import slow_requests
+from backend.helpers.rate_limit import login_rate_limiter
+from backend.helpers.revocation import revocation_epoch
+from backend.helpers.sessions import live_sessions
+from backend.helpers.tokens import token_cache
 from backend.main import app
 
 
@@ -13,6 +22,7 @@ testing_engine = create_async_engine(
     poolclass=StaticPool,
     connect_args={"check_same_thread": False},
 )
+instrument_engine(testing_engine)
 TestingSessionLocal = async_sessionmaker(
     expire_on_commit=False, bind=testing_engine, class_=AsyncSession
 )
@@ -25,6 +35,63 @@ async def get_test_db():
 
 app.dependency_overrides[get_db] = get_test_db
 
+# Most statements each endpoint may run per request, including background
+# tasks. Lower a budget when a round-trip is removed; raising one needs a reason.
+QUERY_BUDGETS = {
+    ("POST", "/auth/login"): 4,
+    ("POST", "/auth/refresh"): 3,
+    ("POST", "/auth/logout"): 4,
+    ("GET", "/auth/sessions"): 3,
+    ("DELETE", "/auth/sessions/{session_id}"): 3,
+    ("POST", "/auth/introspect"): 2,
+    ("GET", "/users/"): 1,
+    ("GET", "/users/export"): 1,
+    ("GET", "/users/{id}"): 1,
+    ("POST", "/users/"): 2,
+    ("POST", "/users/bulk"): 2,
+    ("PUT", "/users/{id}"): 3,
+    ("DELETE", "/users/{id}"): 4,
+    ("POST", "/admin/revoke-all-sessions"): 2,
+}
+
+request_queries: ContextVar[list[int] | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+@event.listens_for(testing_engine.sync_engine, "before_cursor_execute")
+def count_request_query(*args):
+    counter = request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class QueryBudgetApp:
+    def __init__(self, app):
+        self.app = app
+        self.log: list[tuple[str, str | None, int]] = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        counter = [0]
+        token = request_queries.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_queries.reset(token)
+
+        route = scope.get("route")
+        key = (scope["method"], route.path if route is not None else None)
+        self.log.append((*key, counter[0]))
+        budget = QUERY_BUDGETS.get(key)
+        if budget is not None and counter[0] > budget:
+            raise AssertionError(
+                f"{key[0]} {key[1]} ran {counter[0]} SQL statements, "
+                f"budget is {budget}"
+            )
+
 
 @pytest.fixture(scope="session", autouse=True)
 async def create_db_tables():
@@ -39,6 +106,21 @@ async def reset_db():
     async with testing_engine.begin() as con:
         await con.execute(text("DELETE FROM refresh_tokens"))
         await con.execute(text("DELETE FROM users"))
+        await con.execute(text("DELETE FROM revocation_epoch"))
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    auth_cache.clear()
+    token_cache.clear()
+    revocation_epoch.clear()
+    live_sessions.clear()
+    login_rate_limiter.reset()
+    email_filter.reset()
+    registry.clear()
+    slow_requests.clear()
+    recent_writers.clear()
     yield
 
 
@@ -49,10 +131,26 @@ async def session():
 
 
 @pytest.fixture
-async def client():
+def session_factory():
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def query_budgets():
+    return QUERY_BUDGETS
+
+
+@pytest.fixture
+def query_log():
+    return QueryBudgetApp(app)
+
+
+@pytest.fixture
+async def client(query_log):
     async with LifespanManager(app) as manager:
+        query_log.app = manager.app
         async with AsyncClient(
-            transport=ASGITransport(app=manager.app), base_url="http://test"
+            transport=ASGITransport(app=query_log), base_url="http://test"
         ) as ac:
             yield ac
 
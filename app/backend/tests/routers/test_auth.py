@@ -1,4 +1,6 @@
 import pytest
+from backend.config import settings
+from backend.helpers.sessions import live_sessions
 
 
 @pytest.mark.asyncio
@@ -75,3 +77,313 @@ async def test_logout(auth_client):
 
     assert response.status_code == 200
     assert response.json() == {"detail": "Successfully logged out"}
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_token(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    login_data = (
+        await client.post(
+            "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+        )
+    ).json()
+
+    first = await client.post(
+        "/auth/refresh", json={"refresh_token": login_data["refresh_token"]}
+    )
+    second = await client.post(
+        "/auth/refresh", json={"refresh_token": first.json()["refresh_token"]}
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json()["refresh_token"] != second.json()["refresh_token"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_replay_revokes_family(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    login_data = (
+        await client.post(
+            "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+        )
+    ).json()
+    rotated = await client.post(
+        "/auth/refresh", json={"refresh_token": login_data["refresh_token"]}
+    )
+
+    replay = await client.post(
+        "/auth/refresh", json={"refresh_token": login_data["refresh_token"]}
+    )
+    assert replay.status_code == 401
+    assert replay.json() == {"detail": "Token revoked or invalid"}
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": rotated.json()["refresh_token"]}
+    )
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Token revoked or invalid"}
+
+    response = await client.get(
+        "/auth/sessions",
+        headers={"Authorization": f"Bearer {rotated.json()['access_token']}"},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_after_logout(auth_client):
+    login_data = (
+        await auth_client.post(
+            "/auth/login",
+            data={"username": "test@example.com", "password": "password123"},
+        )
+    ).json()
+    auth_client.headers.update(
+        {"Authorization": f"Bearer {login_data['access_token']}"}
+    )
+    await auth_client.post("/auth/logout")
+
+    response = await auth_client.post(
+        "/auth/refresh", json={"refresh_token": login_data["refresh_token"]}
+    )
+
+    assert response.status_code == 401
+
+
+INTROSPECTION_KEY = {"X-Introspection-Key": "test-introspection-key"}
+
+
+@pytest.fixture
+def introspection_key(monkeypatch):
+    monkeypatch.setattr(settings, "INTROSPECTION_API_KEY", "test-introspection-key")
+
+
+@pytest.mark.asyncio
+async def test_introspect(client, introspection_key):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    await client.post(
+        "/users/",
+        json={"username": "other", "email": "other@mper.com", "password": "other"},
+    )
+    first = (
+        await client.post(
+            "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+        )
+    ).json()
+    second = (
+        await client.post(
+            "/auth/login", data={"username": "other@mper.com", "password": "other"}
+        )
+    ).json()
+    await client.post(
+        "/auth/logout", headers={"Authorization": f"Bearer {second['access_token']}"}
+    )
+
+    response = await client.post(
+        "/auth/introspect",
+        headers=INTROSPECTION_KEY,
+        json={
+            "tokens": [
+                first["access_token"],
+                first["refresh_token"],
+                second["access_token"],
+                "badtoken",
+            ]
+        },
+    )
+    results = response.json()["results"]
+
+    assert response.status_code == 200
+    assert results[0]["active"] is True
+    assert results[0]["sub"] == "1"
+    assert results[0]["token_type"] == "access_token"
+    assert results[1] == {"active": False}
+    assert results[2] == {"active": False}
+    assert results[3] == {"active": False}
+
+
+@pytest.mark.asyncio
+async def test_introspect_rejects_rotated_refresh_token(client, introspection_key):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    tokens = (
+        await client.post(
+            "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+        )
+    ).json()
+    await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    response = await client.post(
+        "/auth/introspect",
+        headers=INTROSPECTION_KEY,
+        json={"tokens": [tokens["refresh_token"]]},
+    )
+
+    assert response.json()["results"] == [{"active": False}]
+
+
+@pytest.mark.asyncio
+async def test_introspect_requires_key(client, introspection_key):
+    response = await client.post("/auth/introspect", json={"tokens": ["x"]})
+    assert response.status_code == 403
+
+    response = await client.post(
+        "/auth/introspect",
+        headers={"X-Introspection-Key": "wrong"},
+        json={"tokens": ["x"]},
+    )
+    assert response.status_code == 403
+
+
+async def login_as(client, **headers):
+    response = await client.post(
+        "/auth/login",
+        data={"username": "mper@mper.com", "password": "mper"},
+        headers=headers,
+    )
+    return response.json()
+
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_login_keeps_other_sessions(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    laptop = await login_as(client, **{"X-Device-Id": "laptop"})
+    phone = await login_as(client, **{"X-Device-Id": "phone"})
+
+    response = await client.get("/auth/sessions", headers=bearer(laptop))
+    sessions = response.json()
+    assert response.status_code == 200
+    assert {s["device_id"] for s in sessions} == {"laptop", "phone"}
+    assert [s["device_id"] for s in sessions if s["current"]] == ["laptop"]
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": laptop["refresh_token"]}
+    )
+    assert response.status_code == 200
+    response = await client.get("/auth/sessions", headers=bearer(phone))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_login_replaces_session_for_same_device(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    old = await login_as(client, **{"X-Device-Id": "phone"})
+    new = await login_as(client, **{"X-Device-Id": "phone"})
+
+    response = await client.get("/auth/sessions", headers=bearer(new))
+    assert len(response.json()) == 1
+    response = await client.get("/auth/sessions", headers=bearer(old))
+    assert response.status_code == 401
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": old["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_session_cap_evicts_oldest(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_SESSIONS_PER_USER", 2)
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    first = await login_as(client)
+    await login_as(client)
+    third = await login_as(client)
+
+    response = await client.get("/auth/sessions", headers=bearer(third))
+    assert len(response.json()) == 2
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": first["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_delete_session(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    laptop = await login_as(client)
+    phone = await login_as(client)
+    sessions = (await client.get("/auth/sessions", headers=bearer(laptop))).json()
+    phone_session = next(s["id"] for s in sessions if not s["current"])
+
+    response = await client.delete(
+        f"/auth/sessions/{phone_session}", headers=bearer(laptop)
+    )
+    assert response.status_code == 200
+    response = await client.delete(
+        f"/auth/sessions/{phone_session}", headers=bearer(laptop)
+    )
+    assert response.status_code == 404
+
+    response = await client.get("/auth/sessions", headers=bearer(phone))
+    assert response.status_code == 401
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": phone["refresh_token"]}
+    )
+    assert response.status_code == 401
+    response = await client.get("/auth/sessions", headers=bearer(laptop))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_session_revocation_survives_restart(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    laptop = await login_as(client, **{"X-Device-Id": "laptop"})
+    phone = await login_as(client, **{"X-Device-Id": "phone"})
+    sessions = (await client.get("/auth/sessions", headers=bearer(laptop))).json()
+    phone_session = next(s["id"] for s in sessions if not s["current"])
+    await client.delete(f"/auth/sessions/{phone_session}", headers=bearer(laptop))
+
+    # A restarted worker, or one that missed the bus message, starts empty.
+    live_sessions.clear()
+
+    response = await client.get("/auth/sessions", headers=bearer(phone))
+    assert response.status_code == 401
+    response = await client.get("/auth/sessions", headers=bearer(laptop))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rejected_as_bearer(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    tokens = await login_as(client)
+    refresh_bearer = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    response = await client.get("/auth/sessions", headers=refresh_bearer)
+    assert response.status_code == 401
+
+    await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    response = await client.get("/auth/sessions", headers=refresh_bearer)
+    assert response.status_code == 401
@@ -1,7 +1,19 @@
+import asyncio
+import json
 import pytest
+from backend.config import settings
+from backend.database.database import recent_writers
+from backend.helpers.invalidation import USER_TOPIC, invalidation_bus
 
 payload1 = {"username": "test", "email": "test@jomama.com", "password": "pwd"}
 payload2 = {"username": "admin", "email": "git@gites.com", "password": "ok123"}
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def admin_key(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    return {"X-Admin-Key": ADMIN_KEY}
 
 
 # GET ENDPOINTS
@@ -9,7 +21,7 @@ payload2 = {"username": "admin", "email": "git@gites.com", "password": "ok123"}
 async def test_get_all_empty(client):
     response = await client.get("/users/")
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json() == {"items": [], "next_cursor": None}
 
 
 @pytest.mark.asyncio
@@ -17,7 +29,7 @@ async def test_get_all(client):
     await client.post("/users/", json=payload1)
     await client.post("/users/", json=payload2)
     response = await client.get("/users/")
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert len(data) == 2
     assert payload1["username"] == data[0]["username"]
@@ -30,20 +42,104 @@ async def test_get_all(client):
 async def test_get_one_empty(client):
     response = await client.get("/users/")
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json() == {"items": [], "next_cursor": None}
 
 
 @pytest.mark.asyncio
 async def test_get_one(client):
     await client.post("/users/", json=payload1)
     response = await client.get("/users/")
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert len(data) == 1
     assert payload1["username"] == data[0]["username"]
     assert payload1["email"] == data[0]["email"]
 
 
+@pytest.mark.asyncio
+async def test_get_all_paginated(client):
+    for i in range(5):
+        await client.post(
+            "/users/",
+            json={"username": f"user{i}", "email": f"u{i}@x.com", "password": "pwd"},
+        )
+
+    first = (await client.get("/users/", params={"limit": 2})).json()
+    second = (
+        await client.get("/users/", params={"limit": 2, "cursor": first["next_cursor"]})
+    ).json()
+    third = (
+        await client.get(
+            "/users/", params={"limit": 2, "cursor": second["next_cursor"]}
+        )
+    ).json()
+
+    assert [u["username"] for u in first["items"]] == ["user0", "user1"]
+    assert [u["username"] for u in second["items"]] == ["user2", "user3"]
+    assert [u["username"] for u in third["items"]] == ["user4"]
+    assert third["next_cursor"] is None
+    assert "password" not in first["items"][0]
+
+
+@pytest.mark.asyncio
+async def test_get_all_bad_cursor(client):
+    response = await client.get("/users/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.asyncio
+async def test_get_all_limit_too_large(client):
+    response = await client.get("/users/", params={"limit": 1000})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(client, admin_key):
+    await client.post("/users/", json=payload1)
+    await client.post("/users/", json=payload2)
+
+    response = await client.get("/users/export", headers=admin_key)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line["email"] for line in lines] == [payload1["email"], payload2["email"]]
+    assert set(lines[0]) == {"id", "username", "email"}
+
+
+@pytest.mark.asyncio
+async def test_export_csv(client, admin_key):
+    await client.post("/users/", json=payload1)
+
+    response = await client.get(
+        "/users/export", params={"format": "csv"}, headers=admin_key
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,username,email",
+        f"1,{payload1['username']},{payload1['email']}",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_empty(client, admin_key):
+    response = await client.get("/users/export", headers=admin_key)
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+@pytest.mark.asyncio
+async def test_export_requires_admin_key(client, admin_key):
+    await client.post("/users/", json=payload1)
+
+    response = await client.get("/users/export")
+
+    assert response.status_code == 403
+
+
 # POST ENDPOINTS
 @pytest.mark.asyncio
 async def test_create(client):
@@ -54,6 +150,23 @@ async def test_create(client):
     assert data["email"] == payload1["email"]
 
 
+async def test_create_publishes_write(client, monkeypatch):
+    published = []
+    publish = invalidation_bus.publish
+
+    def record(topic, payload):
+        published.append((topic, payload))
+        publish(topic, payload)
+
+    monkeypatch.setattr(invalidation_bus, "publish", record)
+
+    response = await client.post("/users/", json=payload1)
+    new_id = response.json()["id"]
+
+    assert (USER_TOPIC, str(new_id)) in published
+    assert recent_writers.get(new_id)
+
+
 async def test_create_existing(client):
     await client.post("/users/", json=payload1)
     response = await client.post("/users/", json=payload1)
@@ -61,6 +174,62 @@ async def test_create_existing(client):
     assert response.json() == {"detail": "User already exists"}
 
 
+async def test_create_concurrent_same_email(client):
+    responses = await asyncio.gather(
+        *(client.post("/users/", json=payload1) for _ in range(3))
+    )
+
+    assert sorted(r.status_code for r in responses) == [201, 226, 226]
+
+
+async def test_bulk_create(client, admin_key):
+    await client.post("/users/", json=payload1)
+    response = await client.post(
+        "/users/bulk",
+        headers=admin_key,
+        json={
+            "users": [
+                payload1,
+                payload2,
+                {"username": "third", "email": "third@x.com", "password": "pwd"},
+                {"username": "again", "email": "third@x.com", "password": "pwd"},
+            ]
+        },
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["created"] == 2
+    assert [row["status"] for row in data["results"]] == [
+        "exists",
+        "created",
+        "created",
+        "duplicate",
+    ]
+    assert data["results"][1]["id"] is not None
+
+    login = await client.post(
+        "/auth/login", data={"username": payload2["email"], "password": "ok123"}
+    )
+    assert login.status_code == 200
+
+
+async def test_bulk_create_empty(client, admin_key):
+    response = await client.post("/users/bulk", headers=admin_key, json={"users": []})
+    assert response.status_code == 422
+
+
+async def test_bulk_create_requires_admin_key(client, admin_key):
+    response = await client.post("/users/bulk", json={"users": [payload1]})
+    assert response.status_code == 403
+
+    response = await client.post(
+        "/users/bulk", headers={"X-Admin-Key": "wrong"}, json={"users": [payload1]}
+    )
+    assert response.status_code == 403
+    assert (await client.get("/users/")).json()["items"] == []
+
+
 # PUT ENDPOINTS
 @pytest.mark.asyncio
 async def test_change_password_logged_out(client):
@@ -126,3 +295,39 @@ async def test_delete_other_missing(auth_client):
 async def test_delete_self(auth_client):
     response = await auth_client.delete("/users/1")
     assert response.status_code == 204
+
+
+# QUERY BUDGETS
+@pytest.mark.asyncio
+async def test_query_log_counts_statements(client, query_log):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    await client.get("/users/1")
+
+    assert query_log.log == [("POST", "/users/", 2), ("GET", "/users/{id}", 1)]
+
+
+@pytest.mark.asyncio
+async def test_query_budget_exceeded(client, query_budgets, monkeypatch):
+    monkeypatch.setitem(query_budgets, ("GET", "/users/"), 0)
+
+    with pytest.raises(AssertionError, match="GET /users/ ran 1 SQL statements"):
+        await client.get("/users/")
+
+
+@pytest.mark.asyncio
+async def test_change_password_reuses_authenticated_user(auth_client, query_log):
+    response = await auth_client.put(
+        "/users/1", json={"old_password": "password123", "new_password": "mper321"}
+    )
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "id": 1,
+        "username": "testuser",
+        "email": "test@example.com",
+    }
+    # Token epoch, the user lookup in get_current_user, then the UPDATE.
+    assert query_log.log[-1] == ("PUT", "/users/{id}", 3)
@@ -0,0 +1,129 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from backend.database import database, models
+from backend.database.database import (
+    Base,
+    build_engine,
+    get_db,
+    mark_user_write,
+    rebuild_outdated_tables,
+    warm_up_pool,
+)
+from backend.helpers.tokens import create_access_token
+from backend.main import app
+
+
+@pytest.mark.asyncio
+async def test_build_engine_applies_sqlite_pragmas(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}")
+
+    async with engine.connect() as con:
+        journal_mode = await con.scalar(text("PRAGMA journal_mode"))
+        synchronous = await con.scalar(text("PRAGMA synchronous"))
+        busy_timeout = await con.scalar(text("PRAGMA busy_timeout"))
+    await engine.dispose()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1
+    assert busy_timeout == 5000
+
+
+@pytest.mark.asyncio
+async def test_outdated_refresh_tokens_table_is_rebuilt(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    async with engine.begin() as con:
+        await con.execute(
+            text(
+                "CREATE TABLE refresh_tokens (jti VARCHAR(36) PRIMARY KEY, "
+                "user_id INTEGER NOT NULL, expires_at DATETIME NOT NULL)"
+            )
+        )
+
+    async with engine.begin() as con:
+        assert await con.run_sync(rebuild_outdated_tables) == ["refresh_tokens"]
+        await con.run_sync(Base.metadata.create_all)
+    async with engine.begin() as con:
+        assert await con.run_sync(rebuild_outdated_tables) == []
+        columns = await con.execute(text("PRAGMA table_info(refresh_tokens)"))
+    await engine.dispose()
+
+    assert {"family_id", "device_id", "consumed_at"} <= {row[1] for row in columns}
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool(tmp_path):
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}")
+
+    await warm_up_pool(engine, 3)
+
+    assert engine.pool.checkedin() == 3
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_build_engine_memory_database():
+    engine = build_engine("sqlite+aiosqlite:///:memory:")
+
+    async with engine.connect() as con:
+        assert await con.scalar(text("SELECT 1")) == 1
+    await engine.dispose()
+
+
+@pytest.fixture
+async def replica(tmp_path, monkeypatch):
+    factories = {}
+    for name in ("primary", "replica"):
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as con:
+            await con.run_sync(Base.metadata.create_all)
+        factories[name] = async_sessionmaker(
+            expire_on_commit=False, bind=engine, class_=AsyncSession
+        )
+        async with factories[name]() as session:
+            session.add(models.User(username=name, email="r@r.com", password="p"))
+            await session.commit()
+
+    async def get_primary_db():
+        async with factories["primary"]() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, get_primary_db)
+    monkeypatch.setattr(database, "ReadSessionLocal", factories["replica"])
+    yield
+    for factory in factories.values():
+        await factory.kw["bind"].dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica(replica, client):
+    response = await client.get("/users/1")
+    assert response.json()["username"] == "replica"
+
+    response = await client.get("/users/")
+    assert response.json()["items"][0]["username"] == "replica"
+
+
+@pytest.mark.asyncio
+async def test_reads_after_own_write_go_to_primary(replica, client):
+    mark_user_write(1)
+
+    response = await client.get("/users/1")
+    assert response.json()["username"] == "primary"
+
+
+@pytest.mark.asyncio
+async def test_auth_lookup_uses_replica_until_own_write(replica, client):
+    async for session in app.dependency_overrides[get_db]():
+        user = await session.get(models.User, 1)
+        token = create_access_token(
+            {"sub": "1", "version": str(user.token_version)}
+        )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await client.post("/auth/logout", headers=headers)
+    assert response.status_code == 401
+
+    mark_user_write(1)
+    response = await client.post("/auth/logout", headers=headers)
+    assert response.status_code == 200
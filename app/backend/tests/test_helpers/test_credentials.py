@@ -1,6 +1,21 @@
+import asyncio
+import time
 import pytest
 from fastapi import HTTPException
-from backend.helpers.credentials import compare_ids, hash_password, verify_password
+from sqlalchemy import select
+from backend.database import models
+from backend.helpers.credentials import (
+    HashingPool,
+    build_password_hash,
+    calibrate_argon2,
+    compare_ids,
+    hash_password,
+    hash_password_async,
+    hash_passwords_async,
+    needs_rehash,
+    verify_password,
+    verify_password_async,
+)
 
 
 def test_hash_password():
@@ -36,3 +51,94 @@ def test_compare_ids_forbidden():
 
     assert e.value.status_code == 403
     assert e.value.detail == "Not authorized"
+
+
+@pytest.mark.asyncio
+async def test_hash_password_async():
+    hashed = await hash_password_async("async_password")
+
+    assert hashed != "async_password"
+    assert await verify_password_async("async_password", hashed) is True
+    assert await verify_password_async("wrong_password", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_rejects_when_saturated():
+    pool = HashingPool(workers=1, max_pending=1)
+    busy = asyncio.create_task(pool.run(time.sleep, 0.2))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as e:
+        await pool.run(time.sleep, 0)
+
+    assert e.value.status_code == 503
+    assert e.value.headers == {"Retry-After": "1"}
+    assert pool.rejected == 1
+
+    await busy
+    assert pool.pending == 0
+    await pool.run(time.sleep, 0)
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_pool_map_leaves_workers_free():
+    pool = HashingPool(workers=4, max_pending=8)
+    running = 0
+    peak = 0
+
+    def work(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.02)
+        running -= 1
+        return item
+
+    assert await pool.map(work, range(10)) == list(range(10))
+    assert peak <= 2
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_passwords_async():
+    hashed = await hash_passwords_async(["one", "two", "three"])
+
+    assert len(hashed) == 3
+    assert verify_password("two", hashed[1]) is True
+
+
+def test_needs_rehash_for_outdated_parameters():
+    outdated = build_password_hash(1, 1024, 1).hash("password")
+
+    assert needs_rehash(outdated) is True
+    assert needs_rehash(hash_password("password")) is False
+
+
+def test_calibrate_argon2_stays_within_budget():
+    result = calibrate_argon2(target_s=0.001, max_memory_kib=1024, parallelism=1)
+
+    assert result["time_cost"] >= 1
+    assert 8 <= result["memory_cost_kib"] <= 1024
+    assert result["parallelism"] == 1
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password(client, session):
+    outdated = build_password_hash(1, 1024, 1).hash("password")
+    session.add(models.User(username="old", email="old@old.com", password=outdated))
+    await session.commit()
+
+    response = await client.post(
+        "/auth/login", data={"username": "old@old.com", "password": "password"}
+    )
+    assert response.status_code == 200
+
+    stored = await session.scalar(
+        select(models.User.password)
+        .where(models.User.email == "old@old.com")
+        .execution_options(populate_existing=True)
+    )
+    assert stored != outdated
+    assert needs_rehash(stored) is False
+    assert verify_password("password", stored)
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from backend.database import models
+from backend.helpers.credentials import hash_password
+from backend.helpers.email_filter import BloomFilter, email_filter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    emails = [f"user{i}@example.com" for i in range(1000)]
+    for email in emails:
+        bloom.add(email)
+
+    assert all(email in bloom for email in emails)
+    false_positives = sum(f"absent{i}@example.com" in bloom for i in range(10_000))
+    assert false_positives / 10_000 < 0.03
+    assert bloom.false_positive_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_email_filter_passes_everything_until_loaded():
+    assert email_filter.might_contain("anyone@example.com")
+    assert email_filter.skipped_lookups == 0
+
+
+@pytest.mark.asyncio
+async def test_email_filter_loads_from_database(session, session_factory):
+    session.add(models.User(username="u", email="u@u.com", password="p"))
+    await session.commit()
+
+    await email_filter.load(session_factory)
+
+    assert email_filter.ready
+    assert email_filter.might_contain("u@u.com")
+    assert not email_filter.might_contain("nobody@u.com")
+    assert not await email_filter.is_absent("u@u.com")
+    assert await email_filter.is_absent("nobody@u.com")
+    assert email_filter.stats()["skipped_lookups"] == 1
+
+
+@pytest.mark.asyncio
+async def test_email_filter_confirms_misses_with_a_sync(
+    client, session, session_factory
+):
+    await email_filter.load(session_factory)
+    # Registered on another worker whose bus message never arrived.
+    session.add(
+        models.User(
+            username="mper", email="mper@mper.com", password=hash_password("mper")
+        )
+    )
+    await session.commit()
+    assert not email_filter.might_contain("mper@mper.com")
+
+    response = await client.post(
+        "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+    )
+
+    assert response.status_code == 200
+    assert email_filter.stats()["synced_id"] > 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_sync(session_factory):
+    await email_filter.load(session_factory)
+
+    absent = await asyncio.gather(
+        *(email_filter.is_absent(f"nobody{i}@u.com") for i in range(10))
+    )
+
+    assert all(absent)
+    assert email_filter.syncs == 1
+
+
+@pytest.mark.asyncio
+async def test_login_and_register_with_loaded_filter(client, session_factory):
+    await email_filter.load(session_factory)
+    credentials = {"username": "mper@mper.com", "password": "mper"}
+
+    response = await client.post("/auth/login", data=credentials)
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    assert response.status_code == 201
+    response = await client.post("/auth/login", data=credentials)
+    assert response.status_code == 200
+
+    response = await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    assert response.status_code == 226
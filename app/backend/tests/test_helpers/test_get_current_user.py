@@ -1,8 +1,10 @@
+import asyncio
 import uuid
 import pytest
 import jwt
 from fastapi import HTTPException
-from backend.helpers.get_current_user import get_current_user
+from backend.helpers.auth_cache import auth_cache, invalidate_user
+from backend.helpers.get_current_user import UserContext, get_current_user
 from backend.database import models
 from backend.config import settings
 
@@ -22,7 +24,7 @@ async def test_get_current_user_valid(session):
     payload = {"sub": str(user.id), "version": str(user.token_version)}
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-    result = await get_current_user(token=token, db=session)
+    result = await get_current_user(token=token, db=session, read_db=session)
 
     assert result.id == user.id
     assert result.email == user.email
@@ -33,7 +35,7 @@ async def test_get_current_user_invalid_token(session):
     token = "not-a-real-token"
 
     with pytest.raises(HTTPException) as e:
-        await get_current_user(token=token, db=session)
+        await get_current_user(token=token, db=session, read_db=session)
 
     assert e.value.status_code == 401
     assert e.value.detail == "Could not validate credentials"
@@ -57,7 +59,7 @@ async def test_get_current_user_token_version_mismatch(session):
     await session.commit()
 
     with pytest.raises(HTTPException) as exc:
-        await get_current_user(token=token, db=session)
+        await get_current_user(token=token, db=session, read_db=session)
 
     assert exc.value.status_code == 401
 
@@ -81,3 +83,101 @@ async def test_protected_route_fails_after_version_change(auth_client, session):
 
     assert response.status_code == 401
     assert response.json() == {"detail": "Could not validate credentials"}
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_cache(session):
+    user = models.User(
+        username="c", email="c@c.com", password="p", token_version=uuid.uuid4()
+    )
+    session.add(user)
+    await session.commit()
+
+    token = jwt.encode(
+        {"sub": str(user.id), "version": str(user.token_version)},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    await get_current_user(token=token, db=session, read_db=session)
+    misses = auth_cache.misses
+
+    result = await get_current_user(token=token, db=session, read_db=session)
+
+    assert result.id == user.id
+    assert auth_cache.hits == 1
+    assert auth_cache.misses == misses
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten(session, monkeypatch):
+    user = models.User(
+        username="c", email="c@c.com", password="p", token_version=uuid.uuid4()
+    )
+    session.add(user)
+    await session.commit()
+    token = jwt.encode(
+        {"sub": str(user.id), "version": str(user.token_version)},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+
+    loaded = asyncio.Event()
+    resume = asyncio.Event()
+    get = session.get
+
+    async def paused_get(*args, **kwargs):
+        row = await get(*args, **kwargs)
+        loaded.set()
+        await resume.wait()
+        return row
+
+    monkeypatch.setattr(session, "get", paused_get)
+    request = asyncio.create_task(
+        get_current_user(token=token, db=session, read_db=session)
+    )
+    await loaded.wait()
+    invalidate_user(user.id)
+    resume.set()
+    await request
+
+    assert auth_cache.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_old_token_rejected_after_logout(auth_client):
+    response = await auth_client.get("/users/1")
+    assert response.status_code == 200
+
+    response = await auth_client.post("/auth/logout")
+    assert response.status_code == 200
+
+    response = await auth_client.post("/auth/logout")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Could not validate credentials"}
+
+
+@pytest.mark.asyncio
+async def test_user_context_reuses_loaded_user(session, session_factory):
+    user = models.User(
+        username="r", email="r@r.com", password="p", token_version=uuid.uuid4()
+    )
+    session.add(user)
+    await session.commit()
+    token = jwt.encode(
+        {"sub": str(user.id), "version": str(user.token_version)},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+
+    async with session_factory() as db:
+        current_user = await get_current_user(token=token, db=db, read_db=db)
+        context = UserContext(user=current_user, db=db)
+        first = await context.load()
+        assert first is db.info["current_user"]
+
+    async with session_factory() as db:
+        current_user = await get_current_user(token=token, db=db, read_db=db)
+        context = UserContext(user=current_user, db=db)
+        loaded = await context.load()
+        assert "current_user" not in db.info
+        assert loaded.id == user.id
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from backend.helpers.auth_cache import AuthUser, auth_cache, cache_user, invalidate_user
+from backend.helpers.invalidation import (
+    LocalInvalidationBus,
+    UnixSocketInvalidationBus,
+)
+
+
+def test_local_bus_dispatches_to_subscribers():
+    bus = LocalInvalidationBus()
+    received = []
+    bus.subscribe("user", received.append)
+
+    bus.publish("user", "1")
+    bus.publish("other", "2")
+
+    assert received == ["1"]
+
+
+def test_invalidate_user_clears_auth_cache():
+    cache_user(AuthUser(id=1, username="u", email="u@u.com", token_version="v"))
+
+    invalidate_user(1)
+
+    assert auth_cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_unix_bus_broadcasts_to_other_workers(tmp_path):
+    worker_a = UnixSocketInvalidationBus(tmp_path)
+    worker_b = UnixSocketInvalidationBus(tmp_path)
+    received_a, received_b = [], []
+    worker_a.subscribe("user", received_a.append)
+    worker_b.subscribe("user", received_b.append)
+    await worker_a.start()
+    await worker_b.start()
+
+    worker_a.publish("user", "7")
+    for _ in range(50):
+        if received_b:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received_a == ["7"]
+    assert received_b == ["7"]
+
+    await worker_a.stop()
+    await worker_b.stop()
+    assert list(tmp_path.glob("*.sock")) == []
+
+
+@pytest.mark.asyncio
+async def test_unix_bus_removes_dead_peers(tmp_path):
+    dead = UnixSocketInvalidationBus(tmp_path)
+    await dead.start()
+    dead._transport.close()
+    dead._transport = None
+
+    worker = UnixSocketInvalidationBus(tmp_path)
+    await worker.start()
+    worker.publish("user", "1")
+
+    assert not dead.path.exists()
+    await worker.stop()
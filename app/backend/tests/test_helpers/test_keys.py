@@ -0,0 +1,95 @@
+import os
+import time
+import jwt
+import pytest
+from backend.cli import main as cli
+from backend.helpers import keys
+from backend.helpers.keys import load_key_ring
+from backend.helpers.tokens import decode_token, mint_token
+
+
+def set_age(keys_dir, kid, seconds):
+    created_at = time.time() - seconds
+    os.utime(keys_dir / f"{kid}.pem", (created_at, created_at))
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    # The "z-" kid sorts last by name but was generated first.
+    cli(["generate-signing-key", "--keys-dir", str(tmp_path), "--kid", "z-old"])
+    cli(["generate-signing-key", "--keys-dir", str(tmp_path), "--kid", "k2"])
+    set_age(tmp_path, "z-old", 7200)
+    set_age(tmp_path, "k2", 60)
+    return tmp_path
+
+
+def test_symmetric_key_ring():
+    key_ring = load_key_ring("HS256", "secret")
+
+    assert not key_ring.is_asymmetric
+    assert key_ring.verification_key("anything") == "secret"
+    assert key_ring.jwks() == {"keys": []}
+
+
+def test_asymmetric_key_ring_requires_keys(tmp_path):
+    with pytest.raises(ValueError):
+        load_key_ring("EdDSA", "secret")
+    with pytest.raises(ValueError):
+        load_key_ring("EdDSA", "secret", tmp_path)
+
+
+def test_new_key_signs_only_after_jwks_max_age(keys_dir):
+    key_ring = load_key_ring("EdDSA", "secret", keys_dir, publish_delay=3600)
+    assert key_ring.active.kid == "z-old"
+
+    set_age(keys_dir, "k2", 3601)
+    key_ring = load_key_ring("EdDSA", "secret", keys_dir, publish_delay=3600)
+    assert key_ring.active.kid == "k2"
+
+    key_ring = load_key_ring("EdDSA", "secret", keys_dir, "z-old", publish_delay=0)
+    assert key_ring.active.kid == "z-old"
+
+
+def test_fresh_keys_sign_with_the_oldest(keys_dir):
+    set_age(keys_dir, "z-old", 90)
+    key_ring = load_key_ring("EdDSA", "secret", keys_dir, publish_delay=3600)
+
+    assert key_ring.active.kid == "z-old"
+    assert load_key_ring("EdDSA", "secret", keys_dir).active.kid == "k2"
+
+
+def test_tokens_signed_with_active_key(keys_dir, monkeypatch):
+    monkeypatch.setattr(keys, "key_ring", load_key_ring("EdDSA", "", keys_dir, "z-old"))
+    old_token = mint_token({"sub": "1"}).token
+
+    monkeypatch.setattr(keys, "key_ring", load_key_ring("EdDSA", "", keys_dir, "k2"))
+    new_token = mint_token({"sub": "1"}).token
+
+    assert jwt.get_unverified_header(new_token)["kid"] == "k2"
+    assert decode_token(new_token)["sub"] == "1"
+    assert decode_token(old_token)["sub"] == "1"
+
+
+def test_unknown_kid_rejected(keys_dir, monkeypatch):
+    monkeypatch.setattr(keys, "key_ring", load_key_ring("EdDSA", "", keys_dir))
+    token = jwt.encode({"sub": "1"}, "secret", headers={"kid": "missing"})
+
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_token(token)
+
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint(keys_dir, monkeypatch, client):
+    monkeypatch.setattr(keys, "key_ring", load_key_ring("EdDSA", "", keys_dir))
+
+    response = await client.get("/.well-known/jwks.json")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert [key["kid"] for key in data["keys"]] == ["z-old", "k2"]
+    assert all(key["kty"] == "OKP" and key["alg"] == "EdDSA" for key in data["keys"])
+
+    token = mint_token({"sub": "1"}).token
+    public_key = jwt.PyJWK(data["keys"][1]).key
+    assert jwt.decode(token, public_key, algorithms=["EdDSA"])["sub"] == "1"
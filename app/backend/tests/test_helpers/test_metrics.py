@@ -0,0 +1,71 @@
+import json
+import pytest
+from backend.helpers.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram(
+        "latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)
+    )
+    histogram.observe(("/a",), 0.05)
+    histogram.observe(("/a",), 0.5)
+    histogram.observe(("/a",), 5.0)
+
+    lines = histogram.render(histogram.series)
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_registry_merges_worker_snapshots(tmp_path):
+    this_worker = MetricsRegistry()
+    histogram = this_worker.histogram("jobs_seconds", "Jobs.", ("kind",))
+    histogram.observe(("a",), 0.01)
+    other_worker = [0, 1] + [0] * (len(histogram.buckets) - 1) + [0.01, 1]
+    (tmp_path / "99999.json").write_text(
+        json.dumps({"jobs_seconds": [[["a"], other_worker]]})
+    )
+
+    output = this_worker.render(tmp_path)
+
+    assert 'jobs_seconds_count{kind="a"} 2' in output
+    assert histogram.series[("a",)][-1] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    tokens = (
+        await client.post(
+            "/auth/login", data={"username": "mper@mper.com", "password": "mper"}
+        )
+    ).json()
+    await client.get(
+        "/auth/sessions",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    await client.get("/users/1")
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+    body = response.text
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/users/{id}",'
+        'status="200"} 1' in body
+    )
+    assert 'route="<unmatched>",status="404"' in body
+    assert 'password_hash_duration_seconds_count{operation="hash_password"} 1' in body
+    assert 'password_hash_duration_seconds_count{operation="verify_password"} 1' in body
+    assert 'jwt_duration_seconds_count{operation="encode"} 2' in body
+    assert 'jwt_duration_seconds_count{operation="decode"} 1' in body
+    assert 'cache_lookups_total{cache="token",result="miss"} 1' in body
+    assert 'cache_lookups_total{cache="auth",result="miss"} 1' in body
@@ -0,0 +1,88 @@
+import pytest
+from backend.config import settings
+from backend.helpers.profiling import (
+    RequestProfile,
+    SlowRequestLog,
+    requested_mode,
+    slow_requests,
+)
+
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+
+
+def finished_profile(duration: float) -> RequestProfile:
+    profile = RequestProfile("GET", "/")
+    profile.finished = profile.started + duration
+    return profile
+
+
+def test_slow_request_log_keeps_slowest():
+    log = SlowRequestLog(size=2, window=60)
+    for duration in (0.3, 0.1, 0.5, 0.2):
+        log.add(finished_profile(duration))
+
+    assert [p.duration for p in log.slowest()] == pytest.approx([0.5, 0.3])
+
+
+def test_slow_request_log_forgets_old_entries(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("backend.helpers.profiling.time.monotonic", lambda: now)
+    log = SlowRequestLog(size=2, window=60)
+    log.add(finished_profile(5.0))
+
+    now += 61
+    log.add(finished_profile(0.1))
+
+    assert [p.duration for p in log.slowest()] == pytest.approx([0.1])
+
+
+@pytest.mark.asyncio
+async def test_unprofiled_requests_are_not_recorded(client, profiling):
+    await client.get("/users/", headers={"X-Profile": "1"})
+    await client.get("/users/")
+
+    assert slow_requests.slowest() == []
+
+
+@pytest.mark.asyncio
+async def test_profiled_login_breakdown(client, profiling):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    response = await client.post(
+        "/auth/login",
+        data={"username": "mper@mper.com", "password": "mper"},
+        headers={"X-Profile": "stack", "X-Admin-Key": ADMIN_KEY},
+    )
+    assert response.status_code == 200
+
+    response = await client.get(
+        "/admin/slow-requests", headers={"X-Admin-Key": ADMIN_KEY}
+    )
+    [login] = response.json()
+    phases = login["phases_ms"]
+
+    assert login["route"] == "/auth/login"
+    assert login["status"] == 200
+    assert {"dependencies", "endpoint", "serialization", "db", "hashing", "jwt"} <= (
+        phases.keys()
+    )
+    assert phases["hashing"] <= phases["endpoint"] <= login["duration_ms"]
+    assert login["counts"]["jwt"] == 2
+    assert login["stacks"]
+
+
+def test_sampled_requests(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+    assert requested_mode({"headers": []}) == "phases"
+
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    assert requested_mode({"headers": [(b"x-profile", b"stack")]}) is None
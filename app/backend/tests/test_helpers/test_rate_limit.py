@@ -0,0 +1,107 @@
+import uuid
+from fastapi import HTTPException
+import pytest
+from backend.config import settings
+from backend.helpers.rate_limit import (
+    LoginRateLimiter,
+    MemoryRateLimitStorage,
+    SharedMemoryRateLimitStorage,
+    login_rate_limiter,
+)
+
+
+def test_memory_storage_refills_over_window(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("backend.helpers.rate_limit.time.monotonic", lambda: now)
+    storage = MemoryRateLimitStorage(maxsize=10)
+
+    assert storage.hit("k", limit=2, window=10) == 0
+    assert storage.hit("k", limit=2, window=10) == 0
+    assert storage.hit("k", limit=2, window=10) == pytest.approx(5)
+
+    now += 5
+    assert storage.hit("k", limit=2, window=10) == 0
+
+
+def test_shared_memory_storage_is_shared_between_instances():
+    name = f"test-limits-{uuid.uuid4().hex[:8]}"
+    first = SharedMemoryRateLimitStorage(name, slots=4096, key=b"secret")
+    second = SharedMemoryRateLimitStorage(name, slots=4096, key=b"secret")
+    try:
+        assert first.hit("k", limit=1, window=60) == 0
+        assert second.hit("k", limit=1, window=60) > 0
+        assert second.hit("other", limit=1, window=60) == 0
+    finally:
+        second.close()
+        first._shm.unlink()
+        first.close()
+
+
+def test_shared_memory_collisions_keep_the_exhausted_bucket():
+    name = f"test-limits-{uuid.uuid4().hex[:8]}"
+    storage = SharedMemoryRateLimitStorage(name, slots=1, key=b"secret")
+    try:
+        assert storage.hit("email:victim", limit=1, window=60) == 0
+        assert storage.hit("email:attacker", limit=1, window=60) > 0
+        assert storage.hit("email:victim", limit=1, window=60) > 0
+    finally:
+        storage._shm.unlink()
+        storage.close()
+
+
+def test_limiter_counts_rejections():
+    limiter = LoginRateLimiter(
+        MemoryRateLimitStorage(maxsize=10), email_limit=1, ip_limit=2, window=60
+    )
+    limiter.check("a@a.com", "10.0.0.1")
+
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("A@a.com", "10.0.0.1")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "60"
+
+    with pytest.raises(HTTPException):
+        limiter.check("b@a.com", "10.0.0.1")
+    assert limiter.stats() == {
+        "allowed": 1,
+        "rejected_by_ip": 1,
+        "rejected_by_email": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_login_throttled_before_password_check(client, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "email_limit", 2)
+    calls = 0
+
+    async def counting_verify(plain, hashed):
+        nonlocal calls
+        calls += 1
+        return False
+
+    monkeypatch.setattr("backend.routers.auth.verify_password_async", counting_verify)
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    credentials = {"username": "mper@mper.com", "password": "wrong"}
+
+    for _ in range(2):
+        response = await client.post("/auth/login", data=credentials)
+        assert response.status_code == 401
+
+    response = await client.post("/auth/login", data=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limit_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(login_rate_limiter, "email_limit", 1)
+    credentials = {"username": "nobody@mper.com", "password": "wrong"}
+
+    for _ in range(3):
+        response = await client.post("/auth/login", data=credentials)
+        assert response.status_code == 401
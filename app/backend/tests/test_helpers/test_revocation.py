@@ -0,0 +1,83 @@
+import pytest
+from backend.config import settings
+from backend.helpers.revocation import issued_before_epoch, revocation_epoch
+
+ADMIN_KEY = "test-admin-key"
+
+
+@pytest.fixture
+def admin_key(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    return {"X-Admin-Key": ADMIN_KEY}
+
+
+@pytest.mark.parametrize(
+    "payload, epoch, revoked",
+    [
+        ({"iat": 100.0}, 0.0, False),
+        ({}, 0.0, False),
+        ({"iat": 100.0}, 100.5, True),
+        ({"iat": 101.0}, 100.5, False),
+        ({}, 100.5, True),
+        ({"iat": "100"}, 100.5, True),
+    ],
+)
+def test_issued_before_epoch(payload, epoch, revoked):
+    assert issued_before_epoch(payload, epoch) is revoked
+
+
+@pytest.mark.asyncio
+async def test_revoke_all_requires_admin_key(client, admin_key):
+    response = await client.post("/admin/revoke-all-sessions")
+    assert response.status_code == 403
+
+    response = await client.post(
+        "/admin/revoke-all-sessions", headers={"X-Admin-Key": "wrong"}
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_revoke_all_disabled_without_configured_key(client):
+    response = await client.post(
+        "/admin/revoke-all-sessions", headers={"X-Admin-Key": "anything"}
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_revoke_all_sessions(client, admin_key):
+    await client.post(
+        "/users/",
+        json={"username": "mper", "email": "mper@mper.com", "password": "mper"},
+    )
+    credentials = {"username": "mper@mper.com", "password": "mper"}
+    old = (await client.post("/auth/login", data=credentials)).json()
+
+    response = await client.post("/admin/revoke-all-sessions", headers=admin_key)
+    assert response.status_code == 200
+    assert revocation_epoch.value > 0
+
+    response = await client.post(
+        "/auth/logout", headers={"Authorization": f"Bearer {old['access_token']}"}
+    )
+    assert response.status_code == 401
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": old["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+    new = (await client.post("/auth/login", data=credentials)).json()
+    response = await client.post(
+        "/auth/logout", headers={"Authorization": f"Bearer {new['access_token']}"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_revocation_epoch_loaded_from_database(client, admin_key, session):
+    await client.post("/admin/revoke-all-sessions", headers=admin_key)
+    epoch = revocation_epoch.value
+    revocation_epoch.clear()
+
+    assert await revocation_epoch.get(session) == pytest.approx(epoch)
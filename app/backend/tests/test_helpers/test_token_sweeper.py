@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+import uuid
+import pytest
+from sqlalchemy import func, select
+from backend.database import models
+from backend.helpers.token_sweeper import purge_expired_refresh_tokens, sweep_stats
+
+
+async def add_tokens(session, user_id, count, expires_at):
+    for _ in range(count):
+        session.add(
+            models.RefreshToken(
+                jti=str(uuid.uuid4()),
+                family_id=str(uuid.uuid4()),
+                user_id=user_id,
+                expires_at=expires_at,
+            )
+        )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_refresh_tokens(session, session_factory):
+    user = models.User(username="s", email="s@s.com", password="p")
+    session.add(user)
+    await session.commit()
+
+    now = datetime.now(timezone.utc)
+    await add_tokens(session, user.id, 5, now - timedelta(minutes=1))
+    await add_tokens(session, user.id, 2, now + timedelta(days=1))
+    batches = sweep_stats.batches
+
+    purged = await purge_expired_refresh_tokens(session_factory, batch_size=2)
+
+    assert purged == 5
+    assert sweep_stats.batches - batches == 3
+    assert sweep_stats.last_run_purged == 5
+    remaining = await session.scalar(select(func.count(models.RefreshToken.jti)))
+    assert remaining == 2
+
+
+@pytest.mark.asyncio
+async def test_purge_respects_max_batches(session, session_factory):
+    user = models.User(username="s", email="s@s.com", password="p")
+    session.add(user)
+    await session.commit()
+    await add_tokens(
+        session, user.id, 4, datetime.now(timezone.utc) - timedelta(minutes=1)
+    )
+
+    purged = await purge_expired_refresh_tokens(
+        session_factory, batch_size=1, max_batches=3
+    )
+
+    assert purged == 3
+
+
+@pytest.mark.asyncio
+async def test_sweep_metrics_exported(client, session, session_factory):
+    user = models.User(username="s", email="s@s.com", password="p")
+    session.add(user)
+    await session.commit()
+    await add_tokens(
+        session, user.id, 3, datetime.now(timezone.utc) - timedelta(minutes=1)
+    )
+
+    await purge_expired_refresh_tokens(session_factory, batch_size=2)
+    body = (await client.get("/metrics")).text
+
+    assert "refresh_tokens_purged_total 3" in body
+    assert "refresh_token_sweep_batch_duration_seconds_count{} 2" in body
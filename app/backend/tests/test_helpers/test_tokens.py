@@ -4,7 +4,15 @@ from fastapi import HTTPException
 import pytest
 import jwt
 from backend.database import models
-from backend.helpers.tokens import create_access_token, get_refresh_token_payload
+from backend.helpers.tokens import (
+    create_access_token,
+    consume_refresh_token,
+    create_token_pair,
+    decode_refresh_token,
+    decode_token,
+    mint_token,
+    token_cache,
+)
 from backend.config import settings
 
 
@@ -28,8 +36,25 @@ def test_create_access_token_logic():
     assert "jti" in decoded_refresh
 
 
+async def store_refresh_token(session, user: models.User) -> dict:
+    minted = mint_token(
+        {"sub": str(user.id), "version": str(user.token_version)},
+        is_refresh_token=True,
+    )
+    session.add(
+        models.RefreshToken(
+            jti=minted.jti,
+            family_id=str(uuid.uuid4()),
+            user_id=user.id,
+            expires_at=minted.expires_at,
+        )
+    )
+    await session.commit()
+    return decode_refresh_token(minted.token)
+
+
 @pytest.mark.asyncio
-async def test_get_refresh_token_payload_success(session):
+async def test_consume_refresh_token_success(session):
     user_uuid = uuid.uuid4()
     user = models.User(
         username="refresh_user",
@@ -40,45 +65,34 @@ async def test_get_refresh_token_payload_success(session):
     session.add(user)
     await session.commit()
 
-    payload_data = {"sub": str(user.id), "version": str(user_uuid)}
-    refresh_token = create_access_token(payload_data, is_refresh_token=True)
-
-    payload = await get_refresh_token_payload(refresh_token, session)
+    payload = await store_refresh_token(session, user)
 
     assert payload["sub"] == str(user.id)
     assert payload["version"] == str(user_uuid)
-    assert "jti" in payload
+    assert await consume_refresh_token(payload, session) is not None
+    assert await consume_refresh_token(payload, session) is None
 
 
 @pytest.mark.asyncio
-async def test_get_refresh_token_payload_invalid_version(session):
-    user_uuid = uuid.uuid4()
+async def test_consume_refresh_token_invalid_version(session):
     user = models.User(
-        username="u", email="e@e.com", password="p", token_version=user_uuid
+        username="u", email="e@e.com", password="p", token_version=uuid.uuid4()
     )
     session.add(user)
     await session.commit()
-
-    token = create_access_token(
-        {"sub": str(user.id), "version": str(user_uuid)}, is_refresh_token=True
-    )
+    payload = await store_refresh_token(session, user)
 
     user.token_version = uuid.uuid4()
     await session.commit()
 
-    with pytest.raises(HTTPException) as exc:
-        await get_refresh_token_payload(token, session)
+    assert await consume_refresh_token(payload, session) is None
 
-    assert exc.value.status_code == 401
-    assert exc.value.detail == "Invalid or expired refresh token"
 
-
-@pytest.mark.asyncio
-async def test_get_refresh_token_payload_missing_jti(session):
-    token = create_access_token({"sub": "1", "version": "v1"}, is_refresh_token=False)
+def test_decode_refresh_token_missing_jti():
+    token = create_access_token({"sub": "1", "version": str(uuid.uuid4())})
 
     with pytest.raises(HTTPException) as exc:
-        await get_refresh_token_payload(token, session)
+        decode_refresh_token(token)
 
     assert exc.value.status_code == 401
 
@@ -94,14 +108,66 @@ async def test_access_token_expired():
         jwt.decode(expired_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 
 
-@pytest.mark.asyncio
-async def test_get_refresh_token_payload_expired(session):
-    data = {"sub": "1", "version": "v1"}
+def test_decode_refresh_token_expired():
+    data = {"sub": "1", "version": str(uuid.uuid4())}
     expired_refresh_token = create_access_token(
         data, is_refresh_token=True, refresh_token_delta_d=timedelta(days=-1)
     )
     with pytest.raises(HTTPException) as exc:
-        await get_refresh_token_payload(expired_refresh_token, session)
+        decode_refresh_token(expired_refresh_token)
 
     assert exc.value.status_code == 401
     assert exc.value.detail == "Invalid or expired refresh token"
+
+
+def test_mint_token_returns_claims():
+    minted = mint_token({"sub": "1", "version": "v1"}, is_refresh_token=True)
+    decoded = jwt.decode(
+        minted.token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+    assert decoded == minted.claims
+    assert minted.jti == decoded["jti"]
+    assert minted.expires_at.timestamp() == decoded["exp"]
+    assert decoded["iat"] <= decoded["exp"]
+
+
+def test_create_token_pair():
+    pair = create_token_pair({"sub": "1", "version": "v1"})
+
+    assert pair.access.jti is None
+    assert pair.refresh.jti is not None
+    assert pair.access.claims["sub"] == pair.refresh.claims["sub"] == "1"
+    assert pair.access.expires_at < pair.refresh.expires_at
+
+
+def test_decode_token_caches_verified_tokens():
+    token = create_access_token({"sub": "1", "version": "v1"})
+
+    first = decode_token(token)
+    first["sub"] = "mutated"
+    second = decode_token(token)
+
+    assert second["sub"] == "1"
+    assert token_cache.hits == 1
+    assert token_cache.misses == 1
+
+
+def test_decode_token_does_not_cache_refresh_tokens():
+    token = create_access_token({"sub": "1", "version": "v1"}, is_refresh_token=True)
+
+    decode_token(token)
+
+    assert len(token_cache) == 0
+
+
+def test_decode_token_does_not_cache_invalid_tokens():
+    expired = create_access_token(
+        {"sub": "1", "version": "v1"}, access_token_delta_m=timedelta(minutes=-5)
+    )
+
+    for _ in range(2):
+        with pytest.raises(jwt.ExpiredSignatureError):
+            decode_token(expired)
+
+    assert len(token_cache) == 0